@@ -0,0 +1,33 @@
+"""Role permissions bitmask
+
+Revision ID: 8b4e6d2a1c37
+Revises: 3f1c2b7d9e4a
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e6d2a1c37'
+down_revision: Union[str, None] = '3f1c2b7d9e4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Permission.ADMIN: ADMIN_PANEL | MANAGE_USERS | MANAGE_ROLES
+ADMIN_PERMISSIONS = 0b111
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('roles', sa.Column('permissions', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+    # Раніше адміністраторами вважалися ролі з id 2 і 3
+    op.execute(f"UPDATE roles SET permissions = {ADMIN_PERMISSIONS} WHERE id IN (2, 3)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('roles', 'permissions')
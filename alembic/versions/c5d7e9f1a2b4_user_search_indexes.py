@@ -0,0 +1,37 @@
+"""User search prefix indexes
+
+Revision ID: c5d7e9f1a2b4
+Revises: 8b4e6d2a1c37
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d7e9f1a2b4'
+down_revision: Union[str, None] = '8b4e6d2a1c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_FIELDS = ('email', 'first_name', 'last_name', 'phone_number')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокує запис у users, але не може виконуватися в транзакції
+    with op.get_context().autocommit_block():
+        for field in SEARCH_FIELDS:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_{field}_prefix '
+                f'ON users (lower({field}) text_pattern_ops)'
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for field in SEARCH_FIELDS:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS ix_users_{field}_prefix')
@@ -0,0 +1,39 @@
+"""Row versions and timestamps
+
+Revision ID: e2a4c6b8d0f3
+Revises: c5d7e9f1a2b4
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a4c6b8d0f3'
+down_revision: Union[str, None] = 'c5d7e9f1a2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('roles', 'users', 'revoked_tokens')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # created_at/updated_at для roles і users створила початкова міграція
+    op.add_column('revoked_tokens',
+                  sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False))
+    op.add_column('revoked_tokens',
+                  sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False))
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.drop_column(table, 'version')
+    op.drop_column('revoked_tokens', 'updated_at')
+    op.drop_column('revoked_tokens', 'created_at')
@@ -1,48 +1,124 @@
-from typing import List
+from typing import Literal
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.models import User
-from app.dependencies.auth_dep import get_current_admin_user
-from app.dependencies.dao_dep import get_session_with_commit
-from app.exceptions import UserNotFoundException
+from app.auth.hashing import password_hasher
+from app.auth.cache import UserSnapshot, invalidate_user, user_cache, user_validators, role_catalog
+from app.auth.revocation import revocation_store
+from app.auth.throttling import login_throttle
+from app.auth.utils import token_cache
+from app.conditional import cache_headers, has_preconditions, is_not_modified, make_etag, not_modified
+from app.auth.permissions import Permission
+from app.dependencies.auth_dep import get_current_admin_user, require_permission
+from app.dao.base import StaleVersionError
+from app.dao.batching import batch_loader
+from app.dao.database import get_pool_stats, session_router
+from app.dao.statements import statement_cache
+from app.dependencies.dao_dep import get_session_with_commit, get_read_session, get_read_primary_until
+from app.exceptions import UserNotFoundException, VersionConflictException
 from app.auth.dao import UsersDAO, RoleDAO
-from app.auth.schemas import SIdFilterModel, SUserInfo
-from app.admin.schemas import SUserUpdateRole
+from app.auth.schemas import SIdFilterModel, SUserInfo, RoleModel
+from app.admin.schemas import SUserUpdateRole, SUsersPage
+from app.serialization import FastJSONResponse, json_dumps
 
 router = APIRouter()
 
+# Зміна й видалення користувачів: окреме право поверх доступу до адмінки
+require_user_manager = require_permission(Permission.ADMIN_PANEL | Permission.MANAGE_USERS)
+
 
 @router.get("/get_user/{user_id}")
-async def get_user(session: AsyncSession = Depends(get_session_with_commit),
-                   user_id: int = None, user_data: User = Depends(get_current_admin_user)
+async def get_user(request: Request, response: Response, session: AsyncSession = Depends(get_read_session),
+                   user_id: int = None, user_data: UserSnapshot = Depends(get_current_admin_user)
                    ) -> SUserInfo:
-    find_user = await UsersDAO(session).find_one_or_none_by_id(data_id=user_id)
+    dao = UsersDAO(session)
+    if has_preconditions(request):
+        # Спершу лише версія рядка: для актуальної копії клієнта повний рядок не читаємо
+        probe = await dao.find_version(user_id, columns=("role_id",))
+        if not probe:
+            raise UserNotFoundException
+        role = await role_catalog.resolve(session, probe.role_id)
+        etag, last_modified = user_validators(user_id, probe.version, probe.updated_at, role)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+
+    find_user = await dao.find_one_or_none_by_id(data_id=user_id)
     if not find_user:
         raise UserNotFoundException
 
-    return find_user
+    snapshot = UserSnapshot.from_model(find_user, await role_catalog.resolve(session, find_user.role_id))
+    response.headers.update(cache_headers(*snapshot.cache_validators()))
+    return SUserInfo.model_validate(snapshot)
+
+
+@router.get("/all_users/", response_model=SUsersPage)
+async def get_all_users(session: AsyncSession = Depends(get_read_session),
+                        cursor: int | None = Query(None, description="Last user ID from the previous page"),
+                        limit: int = Query(100, ge=1, le=1000),
+                        user_data: UserSnapshot = Depends(get_current_admin_user)
+                        ) -> FastJSONResponse:
+    users, next_cursor = await UsersDAO(session).find_page(cursor=cursor, limit=limit)
+    # Рядки з БД уже валідні, тож JSON будуємо напряму, без SUserInfo на кожен рядок
+    items = [SUserInfo.dump_row(user, await role_catalog.resolve(session, user.role_id)) for user in users]
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor})
+
+
+@router.get("/search_users", response_model=SUsersPage)
+async def search_users(session: AsyncSession = Depends(get_read_session),
+                       q: str = Query(..., min_length=1, max_length=100, description="Case-insensitive prefix"),
+                       field: Literal["email", "first_name", "last_name", "phone_number"] | None = Query(
+                           None, description="Search only this field; all searchable fields by default"),
+                       cursor: int | None = Query(None, description="Last user ID from the previous page"),
+                       limit: int = Query(20, ge=1, le=100),
+                       user_data: UserSnapshot = Depends(get_current_admin_user)
+                       ) -> FastJSONResponse:
+    fields = (field,) if field else None
+    users, next_cursor = await UsersDAO(session).search(q, fields=fields, cursor=cursor, limit=limit)
+    items = [SUserInfo.dump_row(user, await role_catalog.resolve(session, user.role_id)) for user in users]
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor})
+
 
+@router.get("/all_users/stream")
+async def stream_all_users(request: Request,
+                           user_data: UserSnapshot = Depends(get_current_admin_user)) -> StreamingResponse:
+    primary_until = get_read_primary_until(request)
 
-@router.get("/all_users/")
-async def get_all_users(session: AsyncSession = Depends(get_session_with_commit),
-                        user_data: User = Depends(get_current_admin_user)
-                        ) -> List[SUserInfo]:
-    return await UsersDAO(session).find_all()
+    async def generate_rows():
+        # Сесія відкривається всередині генератора, бо сесія із залежності закривається до відправки тіла
+        async with session_router.open_read_session(primary_until) as session:
+            async for user in UsersDAO(session).stream_all():
+                role = await role_catalog.resolve(session, user.role_id)
+                yield json_dumps(SUserInfo.dump_row(user, role)) + b"\n"
 
-@router.get("/all_role")
-async def get_all_role(session: AsyncSession = Depends(get_session_with_commit),
-                       user_data: User = Depends(get_current_admin_user)
-                       ):
-    return await RoleDAO(session).find_all()
+    return StreamingResponse(generate_rows(), media_type="application/x-ndjson")
+
+
+@router.get("/all_role", response_model=list[RoleModel])
+async def get_all_role(request: Request, session: AsyncSession = Depends(get_read_session),
+                       user_data: UserSnapshot = Depends(get_current_admin_user)
+                       ) -> Response:
+    dao = RoleDAO(session)
+    if has_preconditions(request):
+        probe = await dao.collection_version()
+        etag = make_etag("roles", probe.count, probe.version, probe.max_id)
+        if is_not_modified(request, etag, probe.updated_at):
+            return not_modified(etag, probe.updated_at)
+
+    roles = await dao.find_all()
+    etag = make_etag("roles", len(roles), sum(role.version for role in roles),
+                     max((role.id for role in roles), default=0))
+    last_modified = max((role.updated_at for role in roles), default=None)
+    return FastJSONResponse([RoleModel.dump_row(role) for role in roles], headers=cache_headers(etag, last_modified))
 
 
 @router.delete("/delete_user/{user_id}")
 async def delete_user(session: AsyncSession = Depends(get_session_with_commit),
-                      user_id: int = None, user_data: User = Depends(get_current_admin_user)
+                      user_id: int = None, user_data: UserSnapshot = Depends(require_user_manager)
                       ):
     delete_users = await UsersDAO(session).delete(filters=SIdFilterModel(id=user_id))
+    invalidate_user(session, user_id)
     if not delete_users:
         raise UserNotFoundException
 
@@ -50,13 +126,38 @@ async def delete_user(session: AsyncSession = Depends(get_session_with_commit),
 
 
 @router.put("/change_role/{user_id}")
-async def change_role(new_role_id: SUserUpdateRole, user_id: int = None,
+async def change_role(new_role_id: SUserUpdateRole, response: Response, user_id: int = None,
+                      expected_version: int | None = Query(None, description="Fail with 409 if the row changed"),
                       session: AsyncSession = Depends(get_session_with_commit),
-                      user_data: User = Depends(get_current_admin_user)
+                      user_data: UserSnapshot = Depends(require_user_manager)
                       ):
-    change_role = await UsersDAO(session).update(filters=SIdFilterModel(id=user_id),
-                                                 values=new_role_id)
-    if not change_role:
+    try:
+        users = await UsersDAO(session).update_returning(filters=SIdFilterModel(id=user_id),
+                                                         values=new_role_id, expected_version=expected_version)
+    except StaleVersionError:
+        raise VersionConflictException
+
+    if not users:
+        invalidate_user(session, user_id)
         raise UserNotFoundException
 
-    return change_role
+    snapshot = UserSnapshot.from_model(users[0], await role_catalog.resolve(session, users[0].role_id))
+    invalidate_user(session, user_id, snapshot)
+    response.headers.update(cache_headers(*snapshot.cache_validators()))
+    return len(users)
+
+
+@router.get("/stats")
+async def get_stats(user_data: UserSnapshot = Depends(get_current_admin_user)) -> dict:
+    return {
+        "password_hasher": password_hasher.stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "db_pool": get_pool_stats(),
+        "db_replicas": session_router.stats(),
+        "statement_cache": statement_cache.stats(),
+        "batch_loader": batch_loader.stats(),
+        "revocation": revocation_store.stats(),
+        "login_throttle": login_throttle.stats(),
+        "role_catalog": role_catalog.stats(),
+    }
@@ -1,4 +1,14 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from app.auth.schemas import SUserInfo
+
 
 class SUserUpdateRole(BaseModel):
-    role_id: int
\ No newline at end of file
+    role_id: int
+
+
+class SUsersPage(BaseModel):
+    items: List[SUserInfo]
+    next_cursor: int | None = Field(default=None, description="ID to pass as cursor for the next page")
@@ -0,0 +1,192 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.auth.dao import UsersDAO, RoleDAO
+from app.auth.models import Role, User
+from app.auth.permissions import Permission
+from app.cache import TTLCache
+from app.conditional import latest, make_etag
+from app.config import settings
+from app.logger import logger
+
+_PENDING_INVALIDATIONS = "user_cache_pending_invalidations"
+_PENDING_ROLES = "role_catalog_pending_roles"
+
+
+@dataclass(frozen=True, slots=True)
+class RoleSnapshot:
+    id: int
+    name: str
+    permissions: int = 0
+    version: int = 0
+    updated_at: datetime | None = None
+
+    @classmethod
+    def from_model(cls, role: Role) -> "RoleSnapshot":
+        return cls(id=role.id, name=role.name, permissions=role.permissions or 0,
+                   version=role.version or 0, updated_at=role.updated_at)
+
+
+class RoleCatalog:
+    """Довідник ролей воркера: role_id -> RoleSnapshot з бітовою маскою прав.
+
+    Ролей мало і змінюються вони рідко, тож перевірка прав — це пошук у словнику й побітове І
+    замість JOIN з roles на кожному запиті. Невідомий role_id підвантажує довідник заново.
+    """
+
+    def __init__(self):
+        self._roles: dict[int, RoleSnapshot] = {}
+        self.loads = 0
+
+    def get(self, role_id: int) -> RoleSnapshot | None:
+        return self._roles.get(role_id)
+
+    def has_permission(self, role_id: int, permission: Permission) -> bool:
+        role = self._roles.get(role_id)
+        return role is not None and role.permissions & permission == permission
+
+    async def load(self, session: AsyncSession) -> None:
+        roles = await RoleDAO(session).find_all()
+        self._roles = {role.id: RoleSnapshot.from_model(role) for role in roles}
+        self.loads += 1
+
+    async def resolve(self, session: AsyncSession, role_id: int) -> RoleSnapshot:
+        role = self._roles.get(role_id)
+        if role is None:
+            await self.load(session)
+            # Роль, якої немає й у БД, не дає жодних прав
+            role = self._roles.get(role_id) or RoleSnapshot(id=role_id, name="")
+        return role
+
+    def stage(self, session: AsyncSession, role: RoleSnapshot) -> None:
+        """Додає або оновлює роль у довіднику після коміту сесії."""
+        session.info.setdefault(_PENDING_ROLES, []).append(role)
+
+    def put(self, role: RoleSnapshot) -> None:
+        self._roles[role.id] = role
+
+    def clear(self) -> None:
+        self._roles.clear()
+
+    async def run_refresh_loop(self, session_maker: async_sessionmaker, interval: float) -> None:
+        """Періодично перечитує ролі, щоб бачити зміни, зроблені іншими воркерами."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_maker() as session:
+                    await self.load(session)
+            except (SQLAlchemyError, OSError) as e:
+                logger.error("Помилка оновлення довідника ролей: %s", e)
+
+    def stats(self) -> dict:
+        return {"roles": len(self._roles), "loads": self.loads}
+
+
+role_catalog = RoleCatalog()
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Незмінний знімок користувача для авторизованих запитів."""
+    id: int
+    email: str
+    phone_number: str
+    first_name: str
+    last_name: str
+    role_id: int
+    role: RoleSnapshot
+    version: int = 0
+    updated_at: datetime | None = None
+
+    @classmethod
+    def from_model(cls, user: User, role: RoleSnapshot) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            phone_number=user.phone_number,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            role_id=user.role_id,
+            role=role,
+            version=user.version or 0,
+            updated_at=user.updated_at,
+        )
+
+    def cache_validators(self) -> tuple[str, datetime | None]:
+        return user_validators(self.id, self.version, self.updated_at, self.role)
+
+
+def user_validators(user_id: int, version: int, updated_at: datetime | None,
+                    role: RoleSnapshot) -> tuple[str, datetime | None]:
+    """ETag і Last-Modified відповіді SUserInfo: тіло залежить і від рядка користувача, і від ролі."""
+    return make_etag("user", user_id, version, role.id, role.version), latest(updated_at, role.updated_at)
+
+
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
+
+async def get_user_snapshot(session: AsyncSession, user_id: int) -> UserSnapshot | None:
+    """Повертає знімок користувача з кешу або з БД."""
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    # Конкурентні запити тих самих чи різних користувачів діляться одним SELECT
+    user = await UsersDAO(session).load_by_id(user_id)
+    if not user:
+        return None
+
+    snapshot = UserSnapshot.from_model(user, await role_catalog.resolve(session, user.role_id))
+    user_cache.set(user_id, snapshot)
+    return snapshot
+
+
+async def get_verified_user_snapshot(session: AsyncSession, user_id: int) -> UserSnapshot | None:
+    """Знімок, звірений з version рядка: для перевірки прав адміністративних запитів.
+
+    invalidate_user скидає кеш лише свого воркера, тож після зміни ролі чи видалення в іншому
+    воркері тут знімок може бути застарілим до USER_CACHE_TTL. Для звичайних запитів це прийнятно,
+    а права на адміністративні дії звіряємо одним дешевим запитом version.
+    """
+    probe = await UsersDAO(session).find_version(user_id)
+    if probe is None:
+        user_cache.pop(user_id)
+        return None
+    snapshot = user_cache.get(user_id)
+    # Менша версія — відставання репліки від запису цього ж воркера, кешований знімок новіший
+    if snapshot is not None and snapshot.version >= (probe.version or 0):
+        return snapshot
+    user_cache.pop(user_id)
+    return await get_user_snapshot(session, user_id)
+
+
+def invalidate_user(session: AsyncSession, user_id: int, snapshot: UserSnapshot | None = None) -> None:
+    """Скидає знімок користувача одразу, а після коміту сесії — ще раз або замінює на snapshot.
+
+    snapshot — новий стан із UPDATE ... RETURNING: наступне читання не піде в БД.
+    """
+    user_cache.pop(user_id)
+    session.info.setdefault(_PENDING_INVALIDATIONS, {})[user_id] = snapshot
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_id, snapshot in session.info.pop(_PENDING_INVALIDATIONS, {}).items():
+        if snapshot is None:
+            user_cache.pop(user_id)
+        else:
+            user_cache.set(user_id, snapshot)
+    for role in session.info.pop(_PENDING_ROLES, ()):
+        role_catalog.put(role)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING_INVALIDATIONS, None)
+    session.info.pop(_PENDING_ROLES, None)
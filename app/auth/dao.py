@@ -1,10 +1,18 @@
 from app.dao.base import BaseDAO
-from app.auth.models import User, Role
+from app.auth.models import User, Role, RevokedToken
 
 
 class UsersDAO(BaseDAO):
     model = User
+    upsert_index_elements = ("email",)
+    searchable_fields = ("email", "first_name", "last_name", "phone_number")
 
 
 class RoleDAO(BaseDAO):
     model = Role
+    upsert_index_elements = ("name",)
+
+
+class RevokedTokensDAO(BaseDAO):
+    model = RevokedToken
+    upsert_index_elements = ("jti",)
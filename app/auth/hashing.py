@@ -0,0 +1,151 @@
+import asyncio
+import math
+import time
+from functools import lru_cache
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from passlib.context import CryptContext
+from passlib.hash import bcrypt
+
+from app.config import settings
+from app.exceptions import PasswordHasherBusyException
+from app.logger import logger
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def get_password_hash(password: str, rounds: int | None = None) -> str:
+    # rounds передаються явно: у воркерах ProcessPoolExecutor власний, некалібрований pwd_context
+    if rounds is None:
+        return pwd_context.hash(password)
+    return _bcrypt_with_rounds(rounds).hash(password)
+
+
+@lru_cache(maxsize=None)
+def _bcrypt_with_rounds(rounds: int):
+    return bcrypt.using(rounds=rounds)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int, max_rounds: int, samples: int = 3) -> int:
+    """Найбільша вартість bcrypt, за якої хеш укладається в target_ms на цій машині.
+
+    Кожен додатковий раунд подвоює час, тож достатньо замірів на min_rounds; береться
+    найкоротший, щоб випадкове навантаження CPU не занижувало вартість.
+    """
+    elapsed_ms = math.inf
+    for _ in range(samples):
+        started = time.perf_counter()
+        _bcrypt_with_rounds(min_rounds).hash("calibration")
+        elapsed_ms = min(elapsed_ms, (time.perf_counter() - started) * 1000)
+    extra = math.floor(math.log2(target_ms / elapsed_ms)) if elapsed_ms < target_ms else 0
+    return max(min_rounds, min(max_rounds, min_rounds + extra))
+
+
+class PasswordHasher:
+    """Виконує bcrypt-хешування в окремому пулі, щоб не блокувати event loop."""
+
+    def __init__(self, max_workers: int, max_queue: int, use_processes: bool = False):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor: Executor | None = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self.rounds: int | None = None
+        self._rehashed = 0
+
+    def set_rounds(self, rounds: int) -> None:
+        """Фіксує вартість bcrypt; needs_rehash вважає застарілими лише слабші хеші, сильніші не знижуються."""
+        self.rounds = rounds
+        pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds)
+
+    async def calibrate(self, target_ms: float, min_rounds: int, max_rounds: int,
+                        rounds: int | None = None) -> int:
+        """Підбирає вартість під target_ms (або бере задану rounds) і застосовує її."""
+        if rounds is None:
+            loop = asyncio.get_running_loop()
+            rounds = await loop.run_in_executor(
+                self._get_executor(), calibrate_bcrypt_rounds, target_ms, min_rounds, max_rounds
+            )
+        self.set_rounds(rounds)
+        logger.info("Вартість bcrypt: %s раундів (ціль %s мс)", rounds, target_ms)
+        return rounds
+
+    async def warm_up(self) -> None:
+        """Запускає всі воркери пулу й завантажує в них бекенд bcrypt."""
+        sample = await self.hash("warm-up")
+        await asyncio.gather(*(self.verify("warm-up", sample) for _ in range(self.max_workers)))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return self.rounds is not None and pwd_context.needs_update(hashed_password)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="password-hasher")
+        return self._executor
+
+    async def _submit(self, func, *args):
+        if self._pending >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise PasswordHasherBusyException
+
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._pending -= 1
+            self._completed += 1
+            self._latency_total += elapsed
+            self._latency_max = max(self._latency_max, elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(get_password_hash, password, self.rounds)
+
+    async def rehash(self, password: str) -> str:
+        hashed = await self.hash(password)
+        self._rehashed += 1
+        return hashed
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "executor": "process" if self.use_processes else "thread",
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "rounds": self.rounds,
+            "rehashed": self._rehashed,
+            "in_flight": self._pending,
+            "queue_depth": max(0, self._pending - self.max_workers),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "latency_avg_ms": round(self._latency_total / self._completed * 1000, 3) if self._completed else 0.0,
+            "latency_max_ms": round(self._latency_max * 1000, 3),
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_QUEUE_SIZE,
+    use_processes=settings.PASSWORD_HASH_EXECUTOR == "process",
+)
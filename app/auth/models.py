@@ -1,6 +1,6 @@
 from typing import Annotated
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import BigInteger, ForeignKey, Index, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.dao.database import Base
@@ -8,6 +8,7 @@ from app.dao.database import Base
 
 class Role(Base):
     name: Mapped[Annotated[str, mapped_column(unique=True, nullable=False)]]
+    permissions: Mapped[int] = mapped_column(BigInteger, default=0, server_default=text('0'))
     users: Mapped[list["User"]] = relationship(back_populates="role")
 
     def __repr__(self):
@@ -21,7 +22,28 @@ class User(Base):
     email: Mapped[Annotated[str, mapped_column(unique=True, nullable=False)]]
     password: Mapped[str]
     role_id: Mapped[int] = mapped_column(ForeignKey('roles.id'), default=1)
-    role: Mapped["Role"] = relationship("Role", back_populates="users", lazy="joined")
+    # Роль на шляху авторизації береться з role_catalog за role_id, тож без JOIN і без лінивого завантаження
+    role: Mapped["Role"] = relationship("Role", back_populates="users", lazy="raise")
 
     def __repr__(self):
-        return f"{self.__class__.__name__}(id={self.id})"
\ No newline at end of file
+        return f"{self.__class__.__name__}(id={self.id})"
+
+
+# Пошук за префіксом без урахування регістру (UsersDAO.search): lower(column) LIKE 'prefix%'
+for _field in ("email", "first_name", "last_name", "phone_number"):
+    Index(
+        f"ix_users_{_field}_prefix",
+        func.lower(getattr(User, _field)).label(f"{_field}_lower"),
+        postgresql_ops={f"{_field}_lower": "text_pattern_ops"},
+    )
+del _field
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti: Mapped[Annotated[str, mapped_column(unique=True, nullable=False)]]
+    expires_at: Mapped[int] = mapped_column(BigInteger, index=True)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(id={self.id}, jti={self.jti})"
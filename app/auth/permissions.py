@@ -0,0 +1,10 @@
+from enum import IntFlag
+
+
+class Permission(IntFlag):
+    """Права ролі як бітова маска в roles.permissions."""
+    ADMIN_PANEL = 1 << 0
+    MANAGE_USERS = 1 << 1
+    MANAGE_ROLES = 1 << 2
+
+    ADMIN = ADMIN_PANEL | MANAGE_USERS | MANAGE_ROLES
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import time
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.auth.dao import RevokedTokensDAO
+from app.auth.models import RevokedToken
+from app.auth.schemas import SRevokedToken
+from app.config import settings
+from app.logger import logger
+
+
+class BloomFilter:
+    """Bloom-фільтр на bytearray: без хибних негативів, тож «ні» відповідає без пошуку."""
+
+    def __init__(self, size_bits: int, hashes: int):
+        self.size_bits = size_bits
+        self.hashes = hashes
+        self._bits = bytearray((size_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size_bits for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationStore:
+    """Відкликані jti в пам'яті воркера: Bloom-фільтр плюс точний словник jti -> exp.
+
+    Воркери інкрементально підвантажують нові записи таблиці revoked_tokens (id > останнього
+    прочитаного), тож перевірка на кожному запиті не звертається до БД. ID serial видаються
+    до коміту, тож рядок 10 може стати видимим після рядка 11: пропущені ID запам'ятовуються
+    і перечитуються, доки не відстануть від останнього більше ніж на lookback.
+    """
+
+    def __init__(self, bloom_size_bits: int, bloom_hashes: int, lookback: int = 1000):
+        self.bloom_size_bits = bloom_size_bits
+        self.bloom_hashes = bloom_hashes
+        self.lookback = lookback
+        self._bloom = BloomFilter(bloom_size_bits, bloom_hashes)
+        self._revoked: dict[str, float] = {}
+        self._last_id = 0
+        # Пропущені ID нижче _last_id: ще не закомічені (або відкочені) транзакції
+        self._gaps: set[int] = set()
+        self.checks = 0
+        self.rejected = 0
+
+    def add(self, jti: str, expires_at: float) -> None:
+        if expires_at <= time.time():
+            return
+        self._revoked[jti] = expires_at
+        self._bloom.add(jti)
+
+    def is_revoked(self, jti: str | None) -> bool:
+        if jti is None:
+            return False
+        self.checks += 1
+        if jti not in self._bloom:
+            return False
+        expires_at = self._revoked.get(jti)
+        if expires_at is None or expires_at <= time.time():
+            return False
+        self.rejected += 1
+        return True
+
+    def purge(self) -> int:
+        """Прибирає прострочені jti і перебудовує фільтр, бо з Bloom-фільтра видаляти не можна."""
+        now = time.time()
+        expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+        if not expired:
+            return 0
+        for jti in expired:
+            del self._revoked[jti]
+        self._bloom = BloomFilter(self.bloom_size_bits, self.bloom_hashes)
+        for jti in self._revoked:
+            self._bloom.add(jti)
+        return len(expired)
+
+    async def revoke(self, session: AsyncSession, jti: str, expires_at: int) -> None:
+        """Зберігає jti у БД (для інших воркерів) і одразу в локальному сховищі."""
+        await RevokedTokensDAO(session).upsert_many([SRevokedToken(jti=jti, expires_at=expires_at)])
+        self.add(jti, expires_at)
+
+    async def sync(self, session: AsyncSession) -> int:
+        """Підвантажує записи, додані іншими воркерами після останньої синхронізації."""
+        condition = RevokedToken.id > self._last_id
+        if self._gaps:
+            condition = or_(condition, RevokedToken.id.in_(sorted(self._gaps)))
+        result = await session.execute(
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+            .where(condition)
+            .order_by(RevokedToken.id)
+        )
+        rows = result.all()
+        seen = set()
+        for row in rows:
+            self.add(row.jti, row.expires_at)
+            seen.add(row.id)
+        self._gaps -= seen
+
+        last_id = max(self._last_id, rows[-1].id) if rows else self._last_id
+        if last_id > self._last_id:
+            self._gaps.update(set(range(self._last_id + 1, last_id)) - seen)
+            self._last_id = last_id
+        # Відкочена транзакція теж лишає пропуск; такі ID колись треба забути
+        self._gaps = {gap for gap in self._gaps if gap > self._last_id - self.lookback}
+        return len(rows)
+
+    async def run_sync_loop(self, session_maker: async_sessionmaker, interval: float) -> None:
+        """Фонова синхронізація; раз на годину ще й чистить прострочені записи таблиці."""
+        next_db_purge = 0.0
+        while True:
+            try:
+                async with session_maker() as session:
+                    await self.sync(session)
+                    if time.monotonic() >= next_db_purge:
+                        await session.execute(delete(RevokedToken).where(RevokedToken.expires_at < int(time.time())))
+                        await session.commit()
+                        next_db_purge = time.monotonic() + 3600
+                self.purge()
+            except (SQLAlchemyError, OSError) as e:
+                logger.error("Помилка синхронізації відкликаних токенів: %s", e)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {
+            "revoked": len(self._revoked),
+            "last_id": self._last_id,
+            "gaps": len(self._gaps),
+            "checks": self.checks,
+            "rejected": self.rejected,
+        }
+
+
+revocation_store = RevocationStore(
+    bloom_size_bits=settings.REVOCATION_BLOOM_SIZE,
+    bloom_hashes=settings.REVOCATION_BLOOM_HASHES,
+    lookback=settings.REVOCATION_SYNC_LOOKBACK,
+)
@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Response, Depends
+from fastapi import APIRouter, HTTPException, Query, Request, Response, Depends
+from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.models import User
-from app.auth.utils import authenticate_user, set_tokens
-from app.dependencies.auth_dep import get_current_user, check_refresh_token
-from app.dependencies.dao_dep import get_session_with_commit, get_session_without_commit
-from app.exceptions import UserAlreadyExistsException, IncorrectEmailOrPasswordException, UserNotFoundException
+from app.auth.cache import RoleSnapshot, UserSnapshot, invalidate_user, role_catalog
+from app.auth.hashing import password_hasher
+from app.auth.revocation import revocation_store
+from app.auth.throttling import login_throttle
+from app.auth.utils import authenticate_user, set_tokens, decode_token
+from app.conditional import cache_headers, is_not_modified, not_modified
+from app.auth.permissions import Permission
+from app.dependencies.auth_dep import get_current_user, check_refresh_token, require_permission
+from app.dao.base import StaleVersionError
+from app.dependencies.dao_dep import get_session_with_commit
+from app.logger import logger
+from app.exceptions import UserAlreadyExistsException, IncorrectEmailOrPasswordException, UserNotFoundException, \
+    TooManyLoginAttemptsException, VersionConflictException
 from app.auth.dao import UsersDAO, RoleDAO
 from app.auth.schemas import SUserRegister, SUserAuth, EmailModel, SUserAddDB, SUserInfo, SIdFilterModel, \
     SUserUpdateData, SUserUpdatePassword, SUserAddNewPassword, SAddRole
@@ -16,25 +25,29 @@ router = APIRouter()
 @router.post("/register/")
 async def register_user(user_data: SUserRegister,
                         session: AsyncSession = Depends(get_session_with_commit)) -> dict:
-    user_dao = UsersDAO(session)
-
-    existing_user = await user_dao.find_one_or_none(filters=EmailModel(email=user_data.email))
-    if existing_user:
-        raise UserAlreadyExistsException
-
     user_data_dict = user_data.model_dump()
     user_data_dict.pop('confirm_password', None)
+    user_data_dict['password'] = await password_hasher.hash(user_data.password)
 
-    await user_dao.add(values=SUserAddDB(**user_data_dict))
+    # Один INSERT ... ON CONFLICT DO NOTHING по email і phone_number замість перевірки й окремого додавання
+    user_id = await UsersDAO(session).add_if_not_exists(values=SUserAddDB(**user_data_dict))
+    if user_id is None:
+        raise UserAlreadyExistsException
     return {'message': 'Реєстрація успішна'}
 
 
 @router.post("/login/")
 async def auth_user(
+        request: Request,
         response: Response,
         user_data: SUserAuth,
-        session: AsyncSession = Depends(get_session_without_commit)
+        session: AsyncSession = Depends(get_session_with_commit)
 ) -> dict:
+    # Відсікаємо флуд до запиту в БД і до bcrypt
+    retry_after = login_throttle.check(request.client.host if request.client else None, user_data.email)
+    if retry_after:
+        raise TooManyLoginAttemptsException(retry_after)
+
     users_dao = UsersDAO(session)
     user = await users_dao.find_one_or_none(
         filters=EmailModel(email=user_data.email)
@@ -42,6 +55,18 @@ async def auth_user(
 
     if not (user and await authenticate_user(user=user, password=user_data.password)):
         raise IncorrectEmailOrPasswordException
+
+    # Хеш зі старою вартістю bcrypt оновлюємо, поки маємо пароль у відкритому вигляді
+    if password_hasher.needs_rehash(user.password):
+        try:
+            new_hash = await password_hasher.rehash(user_data.password)
+        except HTTPException as e:
+            logger.warning("Перехешування пароля користувача %s відкладено: %s", user.id, e.detail)
+        else:
+            await UsersDAO(session).update(filters=SIdFilterModel(id=user.id),
+                                           values=SUserAddNewPassword(password=new_hash))
+            # UPDATE підняв version, тож кешований знімок і його ETag застаріли
+            invalidate_user(session, user.id)
     set_tokens(response, user.id)
     return {
         'ok': True,
@@ -50,21 +75,40 @@ async def auth_user(
 
 
 @router.post("/logout")
-async def logout(response: Response):
+async def logout(request: Request, response: Response,
+                 session: AsyncSession = Depends(get_session_with_commit)):
+    # Відкликаємо обидва токени, щоб викрадені куки не працювали до свого exp
+    for cookie in ("user_access_token", "user_refresh_token"):
+        token = request.cookies.get(cookie)
+        if not token:
+            continue
+        try:
+            payload = decode_token(token)
+        except JWTError:
+            continue
+        if payload.get("jti") and payload.get("exp"):
+            await revocation_store.revoke(session, payload["jti"], payload["exp"])
     response.delete_cookie("user_access_token")
     response.delete_cookie("user_refresh_token")
     return {'message': 'Користувач вийшов з системи'}
 
 
 @router.get("/me/")
-async def get_me(user_data: User = Depends(get_current_user)) -> SUserInfo:
+async def get_me(request: Request, response: Response,
+                 user_data: UserSnapshot = Depends(get_current_user)) -> SUserInfo:
+    # Версія є вже в знімку користувача з кешу, тож 304 не потребує жодного запиту до БД
+    etag, last_modified = user_data.cache_validators()
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    response.headers.update(cache_headers(etag, last_modified))
     return SUserInfo.model_validate(user_data)
 
 
 @router.delete("/me/delete/")
-async def delete_user(user_data: User = Depends(get_current_user),
+async def delete_user(user_data: UserSnapshot = Depends(get_current_user),
                       session: AsyncSession = Depends(get_session_with_commit)):
     user_delete = await UsersDAO(session).delete(filters=SIdFilterModel(id=user_data.id))
+    invalidate_user(session, user_data.id)
 
     if not user_delete:
         raise UserNotFoundException
@@ -73,44 +117,58 @@ async def delete_user(user_data: User = Depends(get_current_user),
 
 
 @router.put("/me/update/")
-async def update_user(user_data_update: SUserUpdateData,
-                      user_data: User = Depends(get_current_user),
+async def update_user(user_data_update: SUserUpdateData, response: Response,
+                      expected_version: int | None = Query(None, description="Fail with 409 if the row changed"),
+                      user_data: UserSnapshot = Depends(get_current_user),
                       session: AsyncSession = Depends(get_session_with_commit)):
-    user_update = await UsersDAO(session).update(filters=SIdFilterModel(id=user_data.id),
-                                                 values=user_data_update)
-
-    if not user_update:
+    try:
+        users = await UsersDAO(session).update_returning(filters=SIdFilterModel(id=user_data.id),
+                                                         values=user_data_update, expected_version=expected_version)
+    except StaleVersionError:
+        raise VersionConflictException
+
+    if not users:
+        invalidate_user(session, user_data.id)
         raise UserNotFoundException
 
+    # Новий стан уже є з RETURNING: кладемо його в кеш після коміту замість повторного читання
+    snapshot = UserSnapshot.from_model(users[0], user_data.role)
+    invalidate_user(session, user_data.id, snapshot)
+    response.headers.update(cache_headers(*snapshot.cache_validators()))
     return {"message": "Дані користувача успішно оновлено"}
 
 
 @router.put("/me/change_password/")
 async def change_password(user_data_update: SUserUpdatePassword,
-                          user_data: User = Depends(get_current_user),
+                          user_data: UserSnapshot = Depends(get_current_user),
                           session: AsyncSession = Depends(get_session_with_commit)):
     user_update = user_data_update.model_dump()
     user_update.pop('old_password', None)
     user_update.pop('confirm_password', None)
+    user_update['password'] = await password_hasher.hash(user_data_update.password)
 
-    user_update = await UsersDAO(session).update(filters=SIdFilterModel(id=user_data.id),
-                                                 values=SUserAddNewPassword(**user_update))
-
-    if not user_update:
+    users = await UsersDAO(session).update_returning(filters=SIdFilterModel(id=user_data.id),
+                                                     values=SUserAddNewPassword(**user_update))
+    if not users:
+        invalidate_user(session, user_data.id)
         raise UserNotFoundException
 
+    invalidate_user(session, user_data.id, UserSnapshot.from_model(users[0], user_data.role))
+
     return {"message": "Дані користувача успішно оновлено"}
 
 
 @router.post("/refresh")
 async def process_refresh_token(
         response: Response,
-        user: User = Depends(check_refresh_token)
+        user: UserSnapshot = Depends(check_refresh_token)
 ):
     set_tokens(response, user.id)
     return {"message": "Токени обновлені"}
 
 
 @router.post("/add_role")
-async def add_roles(add_role: SAddRole, session: AsyncSession = Depends(get_session_with_commit)):
-    await RoleDAO(session).add(values=SAddRole(name=add_role.name, id=add_role.id))
+async def add_roles(add_role: SAddRole, session: AsyncSession = Depends(get_session_with_commit),
+                    user_data: UserSnapshot = Depends(require_permission(Permission.MANAGE_ROLES))):
+    role = await RoleDAO(session).add(values=add_role)
+    role_catalog.stage(session, RoleSnapshot.from_model(role))
@@ -3,8 +3,6 @@ from typing import Self
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator, model_validator, computed_field
 
-from app.auth.utils import get_password_hash
-
 
 class EmailModel(BaseModel):
     email: EmailStr = Field(description="Email")
@@ -31,7 +29,6 @@ class SUserRegister(UserBase):
     def check_password(self) -> Self:
         if self.password != self.confirm_password:
             raise ValueError("Passwords do not match")
-        self.password = get_password_hash(self.password)
         return self
 
 
@@ -46,8 +43,14 @@ class SUserAuth(EmailModel):
 class RoleModel(BaseModel):
     id: int = Field(description="Role ID")
     name: str = Field(description="Role name")
+    permissions: int = Field(0, description="Permission bitmask")
     model_config = ConfigDict(from_attributes=True)
 
+    @staticmethod
+    def dump_row(role) -> dict:
+        """Те саме, що model_validate(role).model_dump(), але без валідації: для списків із БД."""
+        return {"id": role.id, "name": role.name, "permissions": role.permissions}
+
 
 class SUserInfo(UserBase):
     id: int = Field(description="User ID")
@@ -61,6 +64,20 @@ class SUserInfo(UserBase):
     def role_id(self) -> int:
         return self.role.id
 
+    @staticmethod
+    def dump_row(user, role=None) -> dict:
+        """Те саме, що model_validate(user).model_dump(), але без валідації: для списків із БД."""
+        role = role or user.role
+        return {
+            "email": user.email,
+            "phone_number": user.phone_number,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "id": user.id,
+            "role_name": role.name,
+            "role_id": role.id,
+        }
+
 
 class SIdFilterModel(BaseModel):
     id: int | None = None
@@ -90,7 +107,6 @@ class SUserUpdatePassword(BaseModel):
             raise ValueError("New password cannot be the same as the old password")
         if self.password != self.confirm_password:
             raise ValueError("Passwords do not match")
-        self.password = get_password_hash(self.password)
         return self
 
 class SUserAddNewPassword(BaseModel):
@@ -98,4 +114,10 @@ class SUserAddNewPassword(BaseModel):
 
 class SAddRole(BaseModel):
     name: str
-    id: int
\ No newline at end of file
+    id: int
+    permissions: int = Field(0, ge=0, description="Permission bitmask, see app.auth.permissions.Permission")
+
+
+class SRevokedToken(BaseModel):
+    jti: str
+    expires_at: int
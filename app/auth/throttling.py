@@ -0,0 +1,113 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+from app.config import settings
+
+
+class TokenBucketLimiter:
+    """Token bucket на ключ (IP, email), розбитий на шарди з обмеженою кількістю ключів.
+
+    Кожен шард — LRU-словник; при переповненні викидається найдовше неактивний ключ.
+    Викинутий ключ отримує повне відро, тобто помилка можлива лише на користь клієнта.
+    Працює в межах одного event loop, тому без блокувань.
+    """
+
+    def __init__(self, rate: float, capacity: float, shards: int = 16, max_keys: int = 100_000):
+        self.rate = rate
+        self.capacity = capacity
+        self._shards: list[OrderedDict[Hashable, list[float]]] = [OrderedDict() for _ in range(shards)]
+        self._max_keys_per_shard = max(1, max_keys // shards)
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 and self.capacity > 0
+
+    def acquire(self, key: Hashable) -> float:
+        """Забирає токен; повертає 0, якщо дозволено, або скільки секунд чекати."""
+        if not self.enabled:
+            return 0.0
+
+        shard = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        bucket = shard.get(key)
+        if bucket is None:
+            bucket = shard[key] = [self.capacity, now]
+            while len(shard) > self._max_keys_per_shard:
+                shard.popitem(last=False)
+                self.evictions += 1
+        else:
+            shard.move_to_end(key)
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            self.allowed += 1
+            return 0.0
+        self.rejected += 1
+        return (1 - bucket[0]) / self.rate
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            shard.clear()
+
+    def stats(self) -> dict:
+        return {
+            "keys": sum(len(shard) for shard in self._shards),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+        }
+
+
+class LoginThrottle:
+    """Обмеження спроб входу окремо по IP клієнта і по email, до пошуку в БД і bcrypt."""
+
+    def __init__(self, per_ip: TokenBucketLimiter, per_email: TokenBucketLimiter):
+        self.per_ip = per_ip
+        self.per_email = per_email
+        self.enabled = True
+
+    def check(self, ip: str | None, email: str) -> int:
+        """Повертає 0 або значення Retry-After у цілих секундах."""
+        if not self.enabled:
+            return 0
+        wait = self.per_ip.acquire(ip) if ip else 0.0
+        if not wait:
+            wait = self.per_email.acquire(email.lower())
+        return math.ceil(wait)
+
+    def clear(self) -> None:
+        self.per_ip.clear()
+        self.per_email.clear()
+
+    def stats(self) -> dict:
+        ip_stats, email_stats = self.per_ip.stats(), self.per_email.stats()
+        return {
+            "ip_keys": ip_stats["keys"],
+            "ip_rejected": ip_stats["rejected"],
+            "email_keys": email_stats["keys"],
+            "email_rejected": email_stats["rejected"],
+            "rejected": ip_stats["rejected"] + email_stats["rejected"],
+        }
+
+
+login_throttle = LoginThrottle(
+    per_ip=TokenBucketLimiter(
+        rate=settings.LOGIN_RATE_PER_IP,
+        capacity=settings.LOGIN_BURST_PER_IP,
+        shards=settings.LOGIN_THROTTLE_SHARDS,
+        max_keys=settings.LOGIN_THROTTLE_MAX_KEYS,
+    ),
+    per_email=TokenBucketLimiter(
+        rate=settings.LOGIN_RATE_PER_EMAIL,
+        capacity=settings.LOGIN_BURST_PER_EMAIL,
+        shards=settings.LOGIN_THROTTLE_SHARDS,
+        max_keys=settings.LOGIN_THROTTLE_MAX_KEYS,
+    ),
+)
@@ -1,16 +1,25 @@
-from passlib.context import CryptContext
-from jose import jwt
+import hashlib
+import time
+import uuid
+from types import MappingProxyType
+from typing import Mapping
+
+from jose import jwt, ExpiredSignatureError
 from datetime import datetime, timedelta, timezone
 from fastapi.responses import Response
+from app.auth.hashing import password_hasher
+from app.cache import TTLCache
 from app.config import settings
 
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+
 
 def create_tokens(data: dict) -> dict:
     now = datetime.now(timezone.utc)
 
     access_expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE)
     access_payload = data.copy()
-    access_payload.update({"exp": int(access_expire.timestamp()), "type": "access"})
+    access_payload.update({"exp": int(access_expire.timestamp()), "type": "access", "jti": uuid.uuid4().hex})
     access_token = jwt.encode(
         access_payload,
         settings.SECRET_KEY,
@@ -19,7 +28,7 @@ def create_tokens(data: dict) -> dict:
 
     refresh_expire = now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE)
     refresh_payload = data.copy()
-    refresh_payload.update({"exp": int(refresh_expire.timestamp()), "type": "refresh"})
+    refresh_payload.update({"exp": int(refresh_expire.timestamp()), "type": "refresh", "jti": uuid.uuid4().hex})
     refresh_token = jwt.encode(
         refresh_payload,
         settings.SECRET_KEY,
@@ -28,8 +37,26 @@ def create_tokens(data: dict) -> dict:
     return {"access_token": access_token, "refresh_token": refresh_token}
 
 
+def decode_token(token: str) -> Mapping:
+    """jwt.decode з кешем уже перевірених токенів, що живуть у кеші до свого exp."""
+    key = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        # Запис кешу може пережити exp на частку секунди, тому перевіряємо так само, як python-jose
+        if claims["exp"] < time.time():
+            raise ExpiredSignatureError("Signature has expired.")
+        return claims
+
+    claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        claims = MappingProxyType(claims)
+        token_cache.set(key, claims, ttl=exp - time.time())
+    return claims
+
+
 async def authenticate_user(user, password):
-    if not user or verify_password(plain_password=password, hashed_password=user.password) is False:
+    if not user or await password_hasher.verify(password, user.password) is False:
         return None
     return user
 
@@ -54,14 +81,3 @@ def set_tokens(response: Response, user_id: int):
         secure=True,
         samesite="lax"
     )
-
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
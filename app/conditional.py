@@ -0,0 +1,51 @@
+"""Умовні GET: ETag і Last-Modified з версії рядка, 304 без серіалізації тіла."""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    # Слабкий ETag: будується з версій рядків, а не з байтів тіла
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Колонки TIMESTAMP без часового поясу заповнює now() сервера БД, що працює в UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def latest(*values: datetime | None) -> datetime | None:
+    return max((value for value in values if value is not None), default=None)
+
+
+def has_preconditions(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    """Чи актуальна копія клієнта; If-None-Match має пріоритет над If-Modified-Since (RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+
+
+def cache_headers(etag: str, last_modified: datetime | None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def not_modified(etag: str, last_modified: datetime | None) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, last_modified))
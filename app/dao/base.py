@@ -1,107 +1,440 @@
-from typing import TypeVar, Generic, Type
+from typing import AsyncIterator, Callable, Iterator, Sequence, TypeVar, Generic, Type
 from pydantic import BaseModel
+from sqlalchemy import Integer, any_, bindparam, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
-from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete
+from sqlalchemy import insert as sqlalchemy_insert, update as sqlalchemy_update, delete as sqlalchemy_delete
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
 from app.logger import logger
+from app.dao.batching import batch_loader
 from app.dao.database import Base
+from app.dao.statements import FilterShape, filter_criteria, filter_params, filter_shape, statement_cache
 
 T = TypeVar("T", bound=Base)
 
 
+class StaleVersionError(Exception):
+    """Рядок за фільтром існує, але його version уже не дорівнює очікуваній."""
+
+
 class BaseDAO(Generic[T]):
     model: Type[T] = None
+    # Колонки унікального індексу для ON CONFLICT DO UPDATE у upsert_many
+    upsert_index_elements: tuple[str, ...] = ()
+    # Колонки для search; під кожну потрібен індекс на lower(column) (text_pattern_ops у PostgreSQL)
+    searchable_fields: tuple[str, ...] = ()
 
     def __init__(self, session: AsyncSession):
         self._session = session
         if self.model is None:
             raise ValueError("Модель має бути вказана в дочірньому класі")
 
+    @staticmethod
+    def _filter_dict(filters: BaseModel | None) -> dict:
+        """Те саме, що model_dump(exclude_unset=True), але без серіалізації: фільтри містять скаляри."""
+        if filters is None:
+            return {}
+        return {key: getattr(filters, key) for key in sorted(filters.model_fields_set)}
+
+    def _statement(self, key: tuple, build: Callable):
+        return statement_cache.get((self.model, *key), build)
+
+    def _select_statement(self, shape: FilterShape):
+        return self._statement(
+            ("select", shape),
+            lambda: select(self.model).where(*filter_criteria(self.model, shape)),
+        )
+
     async def find_one_or_none_by_id(self, data_id: int):
         try:
-            query = select(self.model).filter_by(id=data_id)
-            result = await self._session.execute(query)
+            query = self._select_statement((("id", False),))
+            result = await self._session.execute(query, {"f_id": data_id})
             record = result.scalar_one_or_none()
-            log_message = f"Запис {self.model.__name__} з ID {data_id} {'знайдено' if record else 'не знайдено'}."
-            logger.info(log_message)
+            logger.info("Запис %s з ID %s %s.", self.model.__name__, data_id, 'знайдено' if record else 'не знайдено')
             return record
         except SQLAlchemyError as e:
-            logger.error(f"Помилка під час пошуку запису з ID {data_id}: {e}")
+            logger.error("Помилка під час пошуку запису з ID %s: %s", data_id, e)
+            raise
+
+    async def find_version(self, data_id: int, columns: Sequence[str] = ()):
+        """Дешева перевірка для умовних GET: лише version, updated_at і columns без читання всього рядка."""
+        try:
+            columns = tuple(columns)
+            query = self._statement(
+                ("version", columns),
+                lambda: select(self.model.version, self.model.updated_at,
+                               *(getattr(self.model, column) for column in columns))
+                .where(self.model.id == bindparam("id")),
+            )
+            result = await self._session.execute(query, {"id": data_id})
+            return result.one_or_none()
+        except SQLAlchemyError as e:
+            logger.error("Помилка під час читання версії запису з ID %s: %s", data_id, e)
             raise
 
+    async def collection_version(self):
+        """Версія всієї таблиці: кількість рядків, сума version, найбільший id і останній updated_at.
+
+        Будь-яке оновлення збільшує суму, видалення зменшує кількість, вставка змінює обидва;
+        видалення з наступною вставкою лишає кількість і суму, але нова вставка отримує більший id.
+        """
+        try:
+            query = self._statement(
+                ("collection_version",),
+                lambda: select(func.count().label("count"),
+                               func.coalesce(func.sum(self.model.version), 0).label("version"),
+                               func.coalesce(func.max(self.model.id), 0).label("max_id"),
+                               func.max(self.model.updated_at).label("updated_at")),
+            )
+            return (await self._session.execute(query)).one()
+        except SQLAlchemyError as e:
+            logger.error("Помилка під час читання версії таблиці %s: %s", self.model.__tablename__, e)
+            raise
+
+    async def find_by_ids(self, ids: Sequence[int]) -> dict[int, T]:
+        """Один запит на набір ID; на PostgreSQL — WHERE id = ANY(:ids) з одним планом на будь-яку кількість."""
+        try:
+            dialect = self._session.get_bind().dialect.name
+
+            def build():
+                if dialect == "postgresql":
+                    condition = self.model.id == any_(bindparam("ids", type_=postgresql.ARRAY(Integer)))
+                else:
+                    condition = self.model.id.in_(bindparam("ids", expanding=True))
+                return select(self.model).where(condition)
+
+            query = self._statement(("by_ids", dialect), build)
+            result = await self._session.execute(query, {"ids": list(ids)})
+            records = {record.id: record for record in result.scalars()}
+            logger.info("Знайдено %s із %s записів %s за ID.", len(records), len(ids), self.model.__name__)
+            return records
+        except SQLAlchemyError as e:
+            logger.error("Помилка під час пошуку записів за ID %s: %s", ids, e)
+            raise
+
+    async def load_by_id(self, data_id: int):
+        """Як find_one_or_none_by_id, але конкурентні виклики зливаються в один find_by_ids.
+
+        Лише для читання: запис може бути завантажений у сесії іншого запиту і перенесений сюди merge.
+        """
+        return await batch_loader.load(self, data_id)
+
     async def find_one_or_none(self, filters: BaseModel):
-        filter_dict = filters.model_dump(exclude_unset=True)
-        logger.info(f"Пошук одного запису {self.model.__name__} за фільтрами: {filter_dict}")
+        filter_dict = self._filter_dict(filters)
+        logger.info("Пошук одного запису %s за фільтрами: %s", self.model.__name__, filter_dict)
         try:
-            query = select(self.model).filter_by(**filter_dict)
-            result = await self._session.execute(query)
+            query = self._select_statement(filter_shape(filter_dict))
+            result = await self._session.execute(query, filter_params(filter_dict))
             record = result.scalar_one_or_none()
-            log_message = f"Запис {'знайдено' if record else 'не знайдено'} за фільтрами: {filter_dict}"
-            logger.info(log_message)
+            logger.info("Запис %s за фільтрами: %s", 'знайдено' if record else 'не знайдено', filter_dict)
             return record
         except SQLAlchemyError as e:
-            logger.error(f"Помилка під час пошуку запису за фільтрами {filter_dict}: {e}")
+            logger.error("Помилка під час пошуку запису за фільтрами %s: %s", filter_dict, e)
             raise
 
     async def find_all(self, filters: BaseModel | None = None):
-        filter_dict = filters.model_dump(exclude_unset=True) if filters else {}
-        logger.info(f"Пошук усіх записів {self.model.__name__} за фільтрами: {filter_dict}")
+        filter_dict = self._filter_dict(filters)
+        logger.info("Пошук усіх записів %s за фільтрами: %s", self.model.__name__, filter_dict)
         try:
-            query = select(self.model).filter_by(**filter_dict)
-            result = await self._session.execute(query)
+            query = self._select_statement(filter_shape(filter_dict))
+            result = await self._session.execute(query, filter_params(filter_dict))
             records = result.scalars().all()
-            logger.info(f"Знайдено {len(records)} записів.")
+            logger.info("Знайдено %s записів.", len(records))
             return records
         except SQLAlchemyError as e:
-            logger.error(f"Помилка під час пошуку усіх записів за фільтрами {filter_dict}: {e}")
+            logger.error("Помилка під час пошуку усіх записів за фільтрами %s: %s", filter_dict, e)
+            raise
+
+    async def find_page(self, filters: BaseModel | None = None, cursor: int | None = None, limit: int = 100):
+        filter_dict = self._filter_dict(filters)
+        logger.info("Пошук сторінки записів %s після ID %s (ліміт %s) за фільтрами: %s",
+                    self.model.__name__, cursor, limit, filter_dict)
+        try:
+            shape = filter_shape(filter_dict)
+
+            def build():
+                query = (
+                    select(self.model)
+                    .where(*filter_criteria(self.model, shape))
+                    .order_by(self.model.id)
+                    .limit(bindparam("limit", type_=Integer))
+                )
+                if cursor is not None:
+                    query = query.where(self.model.id > bindparam("cursor"))
+                return query
+
+            query = self._statement(("page", shape, cursor is not None), build)
+            records, next_cursor = await self._fetch_page(query, filter_params(filter_dict), cursor, limit)
+            logger.info("Знайдено %s записів, наступний курсор: %s.", len(records), next_cursor)
+            return records, next_cursor
+        except SQLAlchemyError as e:
+            logger.error("Помилка під час пошуку сторінки записів після ID %s: %s", cursor, e)
+            raise
+
+    async def _fetch_page(self, query, params: dict, cursor: int | None, limit: int) -> tuple[list[T], int | None]:
+        """Keyset-сторінка: читає limit + 1 рядків, щоб знати, чи є наступна."""
+        params = {**params, "limit": limit + 1}
+        if cursor is not None:
+            params["cursor"] = cursor
+        result = await self._session.execute(query, params)
+        records = result.scalars().all()
+        next_cursor = records[limit - 1].id if len(records) > limit else None
+        return records[:limit], next_cursor
+
+    async def search(self, term: str, fields: Sequence[str] | None = None, cursor: int | None = None,
+                     limit: int = 20) -> tuple[list[T], int | None]:
+        """Пошук за префіксом без урахування регістру по searchable_fields з keyset-пагінацією за ID."""
+        fields = tuple(fields or self.searchable_fields)
+        unknown = set(fields) - set(self.searchable_fields)
+        if not fields or unknown:
+            raise ValueError(f"Пошук по полях {sorted(unknown) or fields} не підтримується для {self.model.__name__}")
+        logger.info("Пошук %s за префіксом %r у полях %s після ID %s (ліміт %s)",
+                    self.model.__name__, term, fields, cursor, limit)
+        try:
+            def build():
+                # lower(column) LIKE :pattern відповідає функціональному індексу lower(column) text_pattern_ops
+                query = (
+                    select(self.model)
+                    .where(or_(*(func.lower(getattr(self.model, field)).like(bindparam("pattern"), escape="\\")
+                                 for field in fields)))
+                    .order_by(self.model.id)
+                    .limit(bindparam("limit", type_=Integer))
+                )
+                if cursor is not None:
+                    query = query.where(self.model.id > bindparam("cursor"))
+                return query
+
+            query = self._statement(("search", fields, cursor is not None), build)
+            pattern = term.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            records, next_cursor = await self._fetch_page(query, {"pattern": pattern}, cursor, limit)
+            logger.info("Знайдено %s записів, наступний курсор: %s.", len(records), next_cursor)
+            return records, next_cursor
+        except SQLAlchemyError as e:
+            logger.error("Помилка під час пошуку %s за префіксом %r: %s", self.model.__name__, term, e)
+            raise
+
+    async def stream_all(self, filters: BaseModel | None = None, batch_size: int = 1000) -> AsyncIterator[T]:
+        filter_dict = self._filter_dict(filters)
+        logger.info("Потокове читання записів %s за фільтрами: %s", self.model.__name__, filter_dict)
+        try:
+            shape = filter_shape(filter_dict)
+            query = self._statement(
+                ("stream", shape),
+                lambda: select(self.model).where(*filter_criteria(self.model, shape)).order_by(self.model.id),
+            )
+            result = await self._session.stream_scalars(
+                query, filter_params(filter_dict), execution_options={"yield_per": batch_size})
+            async for record in result:
+                yield record
+        except SQLAlchemyError as e:
+            logger.error("Помилка під час потокового читання записів за фільтрами %s: %s", filter_dict, e)
             raise
 
     async def add(self, values: BaseModel):
         values_dict = values.model_dump(exclude_unset=True)
-        logger.info(f"Додавання запису {self.model.__name__} з параметрами: {values_dict}")
+        logger.info("Додавання запису %s з параметрами: %s", self.model.__name__, values_dict)
         try:
             new_instance = self.model(**values_dict)
             self._session.add(new_instance)
-            logger.info(f"Запис {self.model.__name__} успішно додано.")
+            logger.info("Запис %s успішно додано.", self.model.__name__)
             await self._session.flush()
             return new_instance
         except SQLAlchemyError as e:
-            logger.error(f"Помилка при додаванні запису: {e}")
+            logger.error("Помилка при додаванні запису: %s", e)
+            raise
+
+    async def add_if_not_exists(self, values: BaseModel) -> int | None:
+        """INSERT ... ON CONFLICT DO NOTHING RETURNING id за один запит; None, якщо порушено унікальний ключ."""
+        values_dict = values.model_dump(exclude_unset=True)
+        # Лише назви полів: значення містять хеш пароля нового користувача
+        logger.info("Додавання запису %s без конфліктів з полями: %s", self.model.__name__, sorted(values_dict))
+        try:
+            query = self._dialect_insert().values(**values_dict).on_conflict_do_nothing().returning(self.model.id)
+            result = await self._session.execute(query)
+            new_id = result.scalar_one_or_none()
+            logger.info("Запис %s додано з ID %s (None — запис вже існує).", self.model.__name__, new_id)
+            return new_id
+        except SQLAlchemyError as e:
+            logger.error("Помилка при додаванні запису: %s", e)
+            raise
+
+    @staticmethod
+    def _chunks(items: Sequence, chunk_size: int | None) -> Iterator[Sequence]:
+        chunk_size = chunk_size or settings.DB_BULK_CHUNK_SIZE
+        for start in range(0, len(items), chunk_size):
+            yield items[start:start + chunk_size]
+
+    def _dialect_insert(self):
+        dialect_name = self._session.bind.dialect.name
+        if dialect_name == "postgresql":
+            return postgresql.insert(self.model)
+        if dialect_name == "sqlite":
+            return sqlite.insert(self.model)
+        raise NotImplementedError(f"ON CONFLICT не підтримується для діалекту {dialect_name}")
+
+    async def add_many(self, values: Sequence[BaseModel], chunk_size: int | None = None) -> list[int]:
+        logger.info("Пакетне додавання %s записів %s", len(values), self.model.__name__)
+        try:
+            counts = []
+            for chunk in self._chunks(values, chunk_size):
+                rows = [item.model_dump(exclude_unset=True) for item in chunk]
+                await self._session.execute(sqlalchemy_insert(self.model), rows)
+                counts.append(len(rows))
+            logger.info("Додано %s записів %s у %s пакетах.", sum(counts), self.model.__name__, len(counts))
+            return counts
+        except SQLAlchemyError as e:
+            logger.error("Помилка при пакетному додаванні записів: %s", e)
+            raise
+
+    async def upsert_many(self, values: Sequence[BaseModel], update_fields: Sequence[str] | None = None,
+                          index_elements: Sequence[str] | None = None,
+                          chunk_size: int | None = None) -> list[int]:
+        """INSERT ... ON CONFLICT: без update_fields конфлікти пропускаються за всіма унікальними ключами."""
+        index_elements = index_elements or self.upsert_index_elements
+        if update_fields and not index_elements:
+            raise ValueError("Для оновлення при конфлікті потрібні колонки унікального індексу.")
+        logger.info("Пакетний upsert %s записів %s, оновлювані поля: %s",
+                    len(values), self.model.__name__, update_fields)
+        try:
+            counts = []
+            for chunk in self._chunks(values, chunk_size):
+                rows = [item.model_dump(exclude_unset=True) for item in chunk]
+                query = self._dialect_insert()
+                if update_fields:
+                    # onupdate колонок не діє для ON CONFLICT DO UPDATE, тому version і updated_at явно
+                    query = query.on_conflict_do_update(
+                        index_elements=list(index_elements),
+                        set_={
+                            **{field: query.excluded[field] for field in update_fields},
+                            "version": self.model.version + 1,
+                            "updated_at": func.now(),
+                        },
+                    )
+                else:
+                    query = query.on_conflict_do_nothing()
+                result = await self._session.execute(query.returning(self.model.id), rows)
+                counts.append(len(result.all()))
+            logger.info("Записано %s з %s записів %s.", sum(counts), len(values), self.model.__name__)
+            return counts
+        except SQLAlchemyError as e:
+            logger.error("Помилка при пакетному upsert записів: %s", e)
+            raise
+
+    async def update_many(self, values: Sequence[BaseModel], chunk_size: int | None = None) -> list[int]:
+        """Оновлення за первинним ключем: кожен елемент values має містити id і нові значення."""
+        logger.info("Пакетне оновлення %s записів %s", len(values), self.model.__name__)
+        try:
+            counts = []
+            for chunk in self._chunks(values, chunk_size):
+                rows = [item.model_dump(exclude_unset=True) for item in chunk]
+                if any(row.get("id") is None for row in rows):
+                    raise ValueError("Кожен запис для пакетного оновлення повинен містити id.")
+                await self._session.execute(sqlalchemy_update(self.model), rows)
+                counts.append(len(rows))
+            await self._session.flush()
+            logger.info("Оновлено %s записів %s у %s пакетах.", sum(counts), self.model.__name__, len(counts))
+            return counts
+        except SQLAlchemyError as e:
+            logger.error("Помилка при пакетному оновленні записів: %s", e)
             raise
 
     async def update(self, filters: BaseModel, values: BaseModel):
-        filter_dict = filters.model_dump(exclude_unset=True)
+        """UPDATE за фільтром; version і updated_at змінюються в тому ж запиті через onupdate колонок.
+
+        Об'єкти, вже завантажені в сесію, не синхронізуються: кому потрібен новий стан, той бере update_returning.
+        """
+        filter_dict = self._filter_dict(filters)
         values_dict = values.model_dump(exclude_unset=True)
-        logger.info(
-            f"Оновлення записів {self.model.__name__} за фільтром: {filter_dict} з параметрами: {values_dict}")
-        try:
-            query = (
-                sqlalchemy_update(self.model)
-                .where(*[getattr(self.model, k) == v for k, v in filter_dict.items()])
-                .values(**values_dict)
-                .execution_options(synchronize_session="fetch")
+        logger.info("Оновлення записів %s за фільтром: %s з параметрами: %s",
+                    self.model.__name__, filter_dict, values_dict)
+        try:
+            shape, value_keys = filter_shape(filter_dict), tuple(sorted(values_dict))
+            query = self._statement(
+                ("update", shape, value_keys),
+                lambda: (
+                    sqlalchemy_update(self.model)
+                    .where(*filter_criteria(self.model, shape))
+                    .values({key: bindparam(f"v_{key}") for key in value_keys})
+                    # "fetch" робив би додатковий SELECT (або RETURNING) на кожен UPDATE
+                    .execution_options(synchronize_session=False)
+                ),
             )
-            result = await self._session.execute(query)
-            logger.info(f"Оновлено {result.rowcount} записів.")
+            params = {**filter_params(filter_dict), **{f"v_{key}": value for key, value in values_dict.items()}}
+            result = await self._session.execute(query, params)
+            logger.info("Оновлено %s записів.", result.rowcount)
             await self._session.flush()
             return result.rowcount
         except SQLAlchemyError as e:
-            logger.error(f"Помилка при оновленні записів: {e}")
+            logger.error("Помилка при оновленні записів: %s", e)
+            raise
+
+    async def update_returning(self, filters: BaseModel, values: BaseModel,
+                               expected_version: int | None = None) -> list[T]:
+        """UPDATE ... RETURNING: оновлені записи в тому ж запиті, без fetch-синхронізації і повторного SELECT.
+
+        Якщо задано expected_version, оновлюються лише рядки з цією версією; коли фільтр знаходить
+        рядок, а версія вже інша, піднімається StaleVersionError.
+        """
+        filter_dict = self._filter_dict(filters)
+        values_dict = values.model_dump(exclude_unset=True)
+        logger.info("Оновлення записів %s з поверненням за фільтром: %s з параметрами: %s (версія %s)",
+                    self.model.__name__, filter_dict, values_dict, expected_version)
+        try:
+            shape, value_keys = filter_shape(filter_dict), tuple(sorted(values_dict))
+            checked = expected_version is not None
+
+            def build():
+                query = (
+                    sqlalchemy_update(self.model)
+                    .where(*filter_criteria(self.model, shape))
+                    .values({key: bindparam(f"v_{key}") for key in value_keys})
+                    .returning(self.model)
+                    # Повернуті рядки перезаписують стан об'єктів сесії, тож синхронізація не потрібна
+                    .execution_options(synchronize_session=False, populate_existing=True)
+                )
+                if checked:
+                    query = query.where(self.model.version == bindparam("expected_version"))
+                return query
+
+            query = self._statement(("update_returning", shape, value_keys, checked), build)
+            params = {**filter_params(filter_dict), **{f"v_{key}": value for key, value in values_dict.items()}}
+            if checked:
+                params["expected_version"] = expected_version
+            result = await self._session.execute(query, params)
+            records = result.scalars().all()
+            logger.info("Оновлено %s записів.", len(records))
+            if not records and checked and await self._exists(shape, filter_params(filter_dict)):
+                raise StaleVersionError(f"{self.model.__name__} {filter_dict}: версія не {expected_version}")
+            return records
+        except SQLAlchemyError as e:
+            logger.error("Помилка при оновленні записів: %s", e)
             raise
 
+    async def _exists(self, shape: FilterShape, params: dict) -> bool:
+        query = self._statement(
+            ("exists", shape),
+            lambda: select(self.model.id).where(*filter_criteria(self.model, shape)).limit(1),
+        )
+        return (await self._session.execute(query, params)).first() is not None
+
     async def delete(self, filters: BaseModel):
-        filter_dict = filters.model_dump(exclude_unset=True)
-        logger.info(f"Видалення записів {self.model.__name__} за фільтром: {filter_dict}")
+        filter_dict = self._filter_dict(filters)
+        logger.info("Видалення записів %s за фільтром: %s", self.model.__name__, filter_dict)
         if not filter_dict:
             logger.error("Потрібен принаймні один фільтр для видалення.")
             raise ValueError("Потрібен принаймні один фільтр для видалення.")
         try:
-            query = sqlalchemy_delete(self.model).filter_by(**filter_dict)
-            result = await self._session.execute(query)
-            logger.info(f"Видалено {result.rowcount} записів.")
+            shape = filter_shape(filter_dict)
+            query = self._statement(
+                ("delete", shape),
+                lambda: sqlalchemy_delete(self.model).where(*filter_criteria(self.model, shape)),
+            )
+            result = await self._session.execute(query, filter_params(filter_dict))
+            logger.info("Видалено %s записів.", result.rowcount)
             await self._session.flush()
             return result.rowcount
         except SQLAlchemyError as e:
-            logger.error(f"Помилка при видаленні записів: {e}")
+            logger.error("Помилка при видаленні записів: %s", e)
             raise
@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, Hashable
+
+from app.config import settings
+
+
+class BatchAborted(Exception):
+    """Лідер пакета не виконав запит (скасування запиту); очікувачі читають самі."""
+
+
+class BatchLoader:
+    """DataLoader для пошуку за ID між конкурентними запитами одного воркера.
+
+    Перший виклик для рушія і моделі стає лідером: чекає один прохід event loop (або
+    window_us мікросекунд), збирає ID, що встигли надійти від інших запитів, і виконує один
+    SELECT ... WHERE id = ANY(:ids) у своїй сесії. Повторні запити того самого ID, поки він
+    очікує або завантажується, отримують спільний future. Пакети групуються за bind сесії,
+    тож читання з репліки й з primary (read-your-writes) не змішуються.
+    """
+
+    def __init__(self, window_us: int = 0, max_batch: int = 500):
+        self.window = window_us / 1_000_000
+        self.max_batch = max_batch
+        self._open: dict[Hashable, dict[Any, asyncio.Future]] = {}
+        self._inflight: dict[tuple[Hashable, Any], asyncio.Future] = {}
+        self.batches = 0
+        self.keys = 0
+        self.shared = 0
+
+    @staticmethod
+    def _group(dao) -> Hashable:
+        session = dao._session
+        return dao.model, session.bind if session.bind is not None else id(session)
+
+    async def load(self, dao, data_id):
+        group = self._group(dao)
+        future = self._inflight.get((group, data_id))
+        if future is not None:
+            self.shared += 1
+            return await self._follow(dao, future, data_id)
+
+        future = self._inflight[(group, data_id)] = asyncio.get_running_loop().create_future()
+        batch = self._open.get(group)
+        if batch is not None and len(batch) < self.max_batch:
+            batch[data_id] = future
+            return await self._follow(dao, future, data_id)
+
+        batch = self._open[group] = {data_id: future}
+        try:
+            # sleep(0) віддає керування на один прохід циклу: запити, готові в цьому ж тіку, приєднуються
+            await asyncio.sleep(self.window)
+            if self._open.get(group) is batch:
+                del self._open[group]
+            records = await dao.find_by_ids(list(batch))
+        except BaseException as e:
+            if self._open.get(group) is batch:
+                del self._open[group]
+            error = e if isinstance(e, Exception) else BatchAborted()
+            self._settle(group, batch, lambda waiter, key: waiter.set_exception(error))
+            # Власний future лідера могли чекати лише дублікати; позначаємо помилку як оброблену
+            future.exception()
+            raise
+
+        self.batches += 1
+        self.keys += len(batch)
+        self._settle(group, batch, lambda waiter, key: waiter.set_result(records.get(key)))
+        return records.get(data_id)
+
+    def _settle(self, group: Hashable, batch: dict, resolve) -> None:
+        for key, waiter in batch.items():
+            self._inflight.pop((group, key), None)
+            if not waiter.done():
+                resolve(waiter, key)
+
+    @staticmethod
+    async def _follow(dao, future: asyncio.Future, data_id):
+        # shield: скасування одного очікувача не скасовує спільний future для інших
+        try:
+            record = await asyncio.shield(future)
+        except BatchAborted:
+            return await dao.find_one_or_none_by_id(data_id=data_id)
+        if record is None:
+            return None
+        # Запис завантажений у сесії лідера; переносимо стан у власну сесію без запиту до БД
+        return await dao._session.merge(record, load=False)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._inflight),
+            "batches": self.batches,
+            "keys": self.keys,
+            "shared": self.shared,
+        }
+
+
+batch_loader = BatchLoader(window_us=settings.DB_BATCH_WINDOW_US, max_batch=settings.DB_BATCH_MAX_SIZE)
@@ -1,46 +1,125 @@
-import uuid
+import asyncio
+import time
 from datetime import datetime
-from decimal import Decimal
+from typing import Awaitable, Callable, Sequence
 
-from sqlalchemy import func, TIMESTAMP, Integer, inspect
+from sqlalchemy import func, literal_column, text, TIMESTAMP, Integer
 from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase, declared_attr
-from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine, AsyncSession, AsyncEngine
 
 from app.config import settings
+from app.dao.profiling import instrument_engine
+from app.dao.routing import ReplicaRouter
+from app.metrics import Histogram
+from app.serialization import model_to_dict
 
 
-engine = create_async_engine(url=settings.DB_URL, echo=True, pool_size=5, max_overflow=0)
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Пул з'єднань, що збирає гістограму часу очікування на checkout."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = Histogram()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - started)
+
+
+def build_engine(url: str) -> AsyncEngine:
+    """Створює рушій з параметрами пулу з Settings."""
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg"):
+        connect_args = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return create_async_engine(
+        url=url,
+        echo=settings.DB_ECHO,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+def get_pool_stats(db_engine: AsyncEngine | None = None) -> dict:
+    """Поточний стан пулу з'єднань рушія."""
+    pool = (db_engine or engine).pool
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+    }
+    if isinstance(pool, TimedAsyncAdaptedQueuePool):
+        stats["checkout_wait_seconds"] = pool.checkout_wait.snapshot()
+    return stats
+
+
+async def warm_up_pool(db_engine: AsyncEngine, connections: int,
+                       queries: Sequence[Callable[[AsyncSession], Awaitable]] = ()) -> int:
+    """Відкриває connections з'єднань одночасно і проганяє на кожному гарячі запити.
+
+    Так установлення з'єднання, інтроспекція типів asyncpg і підготовка запитів
+    відбуваються до першого запиту клієнта. З'єднання повертаються в пул і лишаються в ньому.
+    """
+    async def warm_up_connection() -> None:
+        async with db_engine.connect() as connection:
+            async with AsyncSession(bind=connection) as session:
+                for query in queries:
+                    await query(session)
+
+    await asyncio.gather(*(warm_up_connection() for _ in range(connections)))
+    return connections
+
+
+engine = build_engine(settings.DB_URL)
+instrument_engine(engine)
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+replica_engines = [build_engine(url) for url in settings.DB_REPLICA_URLS]
+for replica_engine in replica_engines:
+    instrument_engine(replica_engine)
+
+session_router = ReplicaRouter(
+    primary=async_session_maker,
+    replicas=[async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+              for replica in replica_engines],
+    retry_after=settings.DB_REPLICA_RETRY_AFTER,
+    sticky_window=settings.DB_READ_YOUR_WRITES_WINDOW,
+)
+
 
 class Base(AsyncAttrs, DeclarativeBase):
     __abstract__ = True
 
+    # Серверні значення за замовчуванням повертаються тим самим INSERT/UPDATE через RETURNING
+    __mapper_args__ = {"eager_defaults": True}
+
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    # created_at: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=func.now())
-    # updated_at: Mapped[datetime] = mapped_column(
-    #     TIMESTAMP,
-    #     server_default=func.now(),
-    #     onupdate=func.now()
-    # )
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+    # Лічильник змін рядка для ETag: кожен UPDATE через BaseDAO чи ORM збільшує його в тому ж запиті
+    version: Mapped[int] = mapped_column(Integer, server_default=text('1'), onupdate=literal_column('version') + 1)
 
     @declared_attr
     def __tablename__(cls) -> str:
         return cls.__name__.lower() + 's'
 
     def to_dict(self, exclude_none: bool = False):
-        result = {}
-        for column in inspect(self.__class__).columns:
-            value = getattr(self, column.key)
-
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            elif isinstance(value, Decimal):
-                value = float(value)
-            elif isinstance(value, uuid.UUID):
-                value = str(value)
-
-            if not exclude_none or value is not None:
-                result[column.key] = value
-
-        return result
+        # Перелік колонок і конвертери кешуються на клас у get_serializer
+        return model_to_dict(self, exclude_none=exclude_none)
@@ -0,0 +1,68 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Запит виконав більше SQL-запитів, ніж дозволяє бюджет."""
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+    budget: int | None = None
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def get_query_stats() -> QueryStats | None:
+    return _query_stats.get()
+
+
+@contextmanager
+def track_queries(budget: int | None = None) -> Iterator[QueryStats]:
+    """Рахує SQL-запити в межах блоку; з budget падає на першому зайвому запиті."""
+    stats = QueryStats(budget=budget)
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def assert_max_queries(budget: int):
+    """Для тестів: `with assert_max_queries(1): await dao.find_one_or_none_by_id(...)`."""
+    return track_queries(budget=budget)
+
+
+def instrument_engine(db_engine: AsyncEngine) -> None:
+    """Підключає лічильник запитів і часу БД до рушія."""
+    sync_engine = db_engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["query_started_at"].pop()
+    stats = _query_stats.get()
+    if stats is None:
+        return
+    stats.count += 1
+    stats.duration += time.perf_counter() - started
+    if stats.budget is not None and stats.count > stats.budget:
+        raise QueryBudgetExceeded(
+            f"Query budget of {stats.budget} exceeded by statement: {statement}"
+        )
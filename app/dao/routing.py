@@ -0,0 +1,131 @@
+import asyncio
+import itertools
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.logger import logger
+
+# Кука з unix-часом, до якого читання клієнта йдуть на primary; її бачать усі воркери
+READ_PRIMARY_COOKIE = "read_primary_until"
+_SESSION_WROTE = "session_wrote"
+
+
+class ReplicaRouter:
+    """Розподіляє сесії читання між репліками (round-robin) з відкатом на primary.
+
+    Сесія відкривається без з'єднання: запит, відповідь на який дає кеш, не займає з'єднання
+    репліки. Стан реплік перевіряє фоновий run_health_loop, а помилка з'єднання в запиті
+    обробника виключає репліку одразу; виключена репліка повертається через retry_after секунд
+    або після успішної перевірки.
+    Після власного запису клієнта його читання sticky_window секунд ідуть на primary, щоб він
+    бачив свої зміни попри затримку реплікації. Дедлайн передається в куці READ_PRIMARY_COOKIE,
+    тож працює незалежно від того, який воркер обслужить наступний запит.
+    """
+
+    def __init__(self, primary: async_sessionmaker, replicas: list[async_sessionmaker],
+                 retry_after: float = 30.0, sticky_window: float = 5.0):
+        self.primary = primary
+        self.replicas = replicas
+        self.retry_after = retry_after
+        self.sticky_window = sticky_window
+        self._next = itertools.cycle(range(len(replicas))) if replicas else None
+        self._down_until = [0.0] * len(replicas)
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.failovers = 0
+        for index, replica in enumerate(replicas):
+            bind = replica.kw.get("bind")
+            if bind is not None:
+                event.listen(bind.sync_engine, "handle_error", self._error_listener(index))
+
+    def _error_listener(self, index: int):
+        def on_error(context: ExceptionContext) -> None:
+            # Помилки SQL не кажуть про стан репліки; лише обрив або невдале під'єднання
+            if context.is_disconnect or context.connection is None:
+                self.mark_unhealthy(index, context.original_exception)
+        return on_error
+
+    def sticky_deadline(self) -> float:
+        """Значення куки READ_PRIMARY_COOKIE для відповіді на запит, що записав дані."""
+        return time.time() + self.sticky_window
+
+    @staticmethod
+    def is_sticky(primary_until: float | None) -> bool:
+        return primary_until is not None and primary_until > time.time()
+
+    def mark_unhealthy(self, index: int, error: Exception | None = None) -> None:
+        now = time.monotonic()
+        if self._down_until[index] <= now:
+            logger.warning("Репліка #%s недоступна, виключаємо на %s с: %s", index, self.retry_after, error)
+            self.failovers += 1
+        self._down_until[index] = now + self.retry_after
+
+    def _healthy_replicas(self) -> list[int]:
+        """Здорові репліки в порядку round-robin, починаючи з наступної."""
+        if self._next is None:
+            return []
+        start = next(self._next)
+        now = time.monotonic()
+        order = [(start + offset) % len(self.replicas) for offset in range(len(self.replicas))]
+        return [index for index in order if self._down_until[index] <= now]
+
+    def open_read_session(self, primary_until: float | None = None) -> AsyncSession:
+        """Сесія читання на наступній здоровій репліці; з'єднання береться лише з першим запитом."""
+        if not self.is_sticky(primary_until):
+            for index in self._healthy_replicas():
+                self.replica_reads += 1
+                return self.replicas[index]()
+
+        self.primary_reads += 1
+        return self.primary()
+
+    async def check_replicas(self) -> int:
+        """Перевіряє всі репліки через SELECT 1; повертає кількість здорових."""
+        healthy = 0
+        for index, replica in enumerate(self.replicas):
+            try:
+                async with replica() as session:
+                    await session.execute(text("SELECT 1"))
+            except (DBAPIError, OSError) as e:
+                self.mark_unhealthy(index, e)
+                continue
+            self._down_until[index] = 0.0
+            healthy += 1
+        return healthy
+
+    async def run_health_loop(self, interval: float) -> None:
+        """Фонова перевірка реплік: запити обробників не платять за неї з'єднанням."""
+        while True:
+            await self.check_replicas()
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "replicas": len(self.replicas),
+            "healthy_replicas": sum(1 for down_until in self._down_until if down_until <= now),
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "failovers": self.failovers,
+        }
+
+
+def session_wrote(session: AsyncSession) -> bool:
+    """Чи виконала сесія INSERT/UPDATE/DELETE (через ORM flush або DAO) з останнього виклику."""
+    return session.info.pop(_SESSION_WROTE, False)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_dml(orm_execute_state: ORMExecuteState) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_SESSION_WROTE] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, flush_context) -> None:
+    session.info[_SESSION_WROTE] = True
@@ -0,0 +1,62 @@
+from typing import Callable, Hashable
+
+from sqlalchemy import bindparam
+from sqlalchemy.sql import Executable
+
+
+class StatementCache:
+    """Кеш побудованих запитів за формою (модель, операція, набір ключів).
+
+    Значення передаються як bound-параметри, тож запит однієї форми будується один раз,
+    а SQLAlchemy знаходить його скомпільовану версію у власному кеші за тим самим ключем.
+    Кількість форм обмежена кодом DAO, тому кеш не витісняє записи.
+    """
+
+    def __init__(self):
+        self._statements: dict[Hashable, Executable] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, build: Callable[[], Executable]) -> Executable:
+        statement = self._statements.get(key)
+        if statement is None:
+            self.misses += 1
+            statement = self._statements[key] = build()
+        else:
+            self.hits += 1
+        return statement
+
+    def clear(self) -> None:
+        self._statements.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._statements),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+statement_cache = StatementCache()
+
+
+FilterShape = tuple[tuple[str, bool], ...]
+
+
+def filter_shape(filter_dict: dict) -> FilterShape:
+    """Форма фільтра: ключі та ознака None (як у filter_by, None дає IS NULL, а не параметр)."""
+    return tuple((key, value is None) for key, value in filter_dict.items())
+
+
+def filter_criteria(model, shape: FilterShape) -> list:
+    """Умови `column == :f_<key>` (або `column IS NULL`) для форми фільтра."""
+    return [
+        getattr(model, key).is_(None) if is_null else getattr(model, key) == bindparam(f"f_{key}")
+        for key, is_null in shape
+    ]
+
+
+def filter_params(filter_dict: dict) -> dict:
+    return {f"f_{key}": value for key, value in filter_dict.items() if value is not None}
@@ -1,13 +1,14 @@
-from datetime import datetime, timezone
+from typing import Callable
 
 from fastapi import Request, Depends
-from jose import jwt, JWTError, ExpiredSignatureError
+from jose import JWTError, ExpiredSignatureError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.dao import UsersDAO
-from app.auth.models import User
-from app.config import settings
-from app.dependencies.dao_dep import get_session_without_commit
+from app.auth.cache import UserSnapshot, get_user_snapshot, get_verified_user_snapshot, role_catalog
+from app.auth.permissions import Permission
+from app.auth.revocation import revocation_store
+from app.auth.utils import decode_token
+from app.dependencies.dao_dep import get_read_session
 from app.exceptions import TokenNoFound, NoJwtException, TokenExpiredException, NoUserIdException, ForbiddenException, \
     UserNotFoundException
 
@@ -30,20 +31,18 @@ def get_refresh_token(request: Request) -> str:
 
 async def check_refresh_token(
         token: str = Depends(get_refresh_token),
-        session: AsyncSession = Depends(get_session_without_commit)
-) -> User:
+        session: AsyncSession = Depends(get_read_session)
+) -> UserSnapshot:
     """Перевіряєм refresh_token і повертаєм користувачу."""
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_token(token)
+        if revocation_store.is_revoked(payload.get("jti")):
+            raise NoJwtException
         user_id = payload.get("sub")
         if not user_id:
             raise NoJwtException
 
-        user = await UsersDAO(session).find_one_or_none_by_id(data_id=int(user_id))
+        user = await get_user_snapshot(session, int(user_id))
         if not user:
             raise NoJwtException
 
@@ -54,33 +53,55 @@ async def check_refresh_token(
 
 async def get_current_user(
         token: str = Depends(get_access_token),
-        session: AsyncSession = Depends(get_session_without_commit)
-) -> User:
+        session: AsyncSession = Depends(get_read_session)
+) -> UserSnapshot:
     """Перевіряєм access_token і повертаєм користувачу."""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
     except ExpiredSignatureError:
         raise TokenExpiredException
     except JWTError:
         raise NoJwtException
 
-    expire: str = payload.get('exp')
-    expire_time = datetime.fromtimestamp(int(expire), tz=timezone.utc)
-    if (not expire) or (expire_time < datetime.now(timezone.utc)):
+    # Значення exp уже перевірив python-jose (або decode_token для кешованого токена)
+    if not payload.get('exp'):
         raise TokenExpiredException
 
+    if revocation_store.is_revoked(payload.get('jti')):
+        raise NoJwtException
+
     user_id: str = payload.get('sub')
     if not user_id:
         raise NoUserIdException
 
-    user = await UsersDAO(session).find_one_or_none_by_id(data_id=int(user_id))
+    user = await get_user_snapshot(session, int(user_id))
     if not user:
         raise UserNotFoundException
     return user
 
 
-async def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
-    """Перевіряєм права користувача як адміністратора."""
-    if current_user.role.id in [2, 3]:
-        return current_user
+async def check_user_permission(session: AsyncSession, current_user: UserSnapshot,
+                                permission: Permission) -> UserSnapshot:
+    """Перевіряє права за знімком, звіреним з БД: роль могли змінити в іншому воркері."""
+    user = await get_verified_user_snapshot(session, current_user.id)
+    if not user:
+        raise UserNotFoundException
+    if role_catalog.has_permission(user.role_id, permission):
+        return user
     raise ForbiddenException
+
+
+async def get_current_admin_user(current_user: UserSnapshot = Depends(get_current_user),
+                                 session: AsyncSession = Depends(get_read_session)) -> UserSnapshot:
+    """Перевіряєм права користувача як адміністратора."""
+    return await check_user_permission(session, current_user, Permission.ADMIN_PANEL)
+
+
+def require_permission(permission: Permission) -> Callable:
+    """Залежність, що пропускає лише користувачів, роль яких має всі біти permission."""
+
+    async def check_permission(current_user: UserSnapshot = Depends(get_current_user),
+                               session: AsyncSession = Depends(get_read_session)) -> UserSnapshot:
+        return await check_user_permission(session, current_user, permission)
+
+    return check_permission
@@ -1,14 +1,22 @@
 from typing import AsyncGenerator
+
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dao.database import async_session_maker
+
+from app.dao.database import async_session_maker, session_router
+from app.dao.routing import READ_PRIMARY_COOKIE, session_wrote
 
 
-async def get_session_with_commit() -> AsyncGenerator[AsyncSession, None]:
+async def get_session_with_commit(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """Асинхронна сесія з автоматичним комітом."""
     async with async_session_maker() as session:
         try:
             yield session
+            wrote = session_wrote(session)
             await session.commit()
+            if wrote:
+                # ReadYourWritesMiddleware перетворить це на куку READ_PRIMARY_COOKIE
+                request.state.read_primary_until = session_router.sticky_deadline()
         except Exception:
             await session.rollback()
             raise
@@ -25,4 +33,24 @@ async def get_session_without_commit() -> AsyncGenerator[AsyncSession, None]:
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+def get_read_primary_until(request: Request) -> float | None:
+    """Дедлайн read-your-writes із куки клієнта; зіпсована кука просто ігнорується."""
+    try:
+        return float(request.cookies[READ_PRIMARY_COOKIE])
+    except (KeyError, ValueError):
+        return None
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Сесія лише для читання: репліка або primary, якщо реплік немає чи клієнт щойно писав."""
+    session = session_router.open_read_session(get_read_primary_until(request))
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
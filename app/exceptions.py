@@ -54,3 +54,27 @@ TokenInvalidFormatException = HTTPException(
     status_code=status.HTTP_400_BAD_REQUEST,
     detail="Invalid token format. Expected 'Bearer <token>'"
 )
+
+
+PasswordHasherBusyException = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail='Server is busy, please try again later'
+)
+
+ServiceNotReadyException = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail='Service is not ready'
+)
+
+VersionConflictException = HTTPException(
+    status_code=status.HTTP_409_CONFLICT,
+    detail='The record was changed by another request, reload it and try again'
+)
+
+
+def TooManyLoginAttemptsException(retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail='Too many login attempts, please try again later',
+        headers={'Retry-After': str(retry_after)}
+    )
@@ -1,30 +1,126 @@
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
+from app.config import settings
+
 LOG_DIR = Path(__file__).parent.parent / "logs"
-LOG_DIR.mkdir(exist_ok=True)
-
-file_handler = RotatingFileHandler(
-    filename=LOG_DIR / "app.log",
-    maxBytes=5 * 1024 * 1024,
-    backupCount=2,
-    encoding="utf-8",
-)
-
-formatter = logging.Formatter(
-    fmt="%(asctime)s [%(levelname)s] [%(name)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
-file_handler.setFormatter(formatter)
-
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(formatter)
-
-logging.basicConfig(
-    level=logging.INFO,
-    handlers=[file_handler, console_handler],
-)
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] [%(name)s] %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматує запис як один JSON-рядок."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускає лише частку записів нижче WARNING для логерів із заданою частотою."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: dict[str, float] = {}
+
+    def _rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            # Шукаємо найближчого предка: "sqlalchemy.engine" успадковує частоту "sqlalchemy"
+            rate, parent = 1.0, name
+            while parent:
+                if parent in self.rates:
+                    rate = self.rates[parent]
+                    break
+                parent = parent.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler, що залишає фоновому потоку форматування запису, але не підстановку аргументів."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Аргументи (ORM-об'єкти, словники фільтрів) можуть змінитися, поки запис у черзі,
+        # тому msg % args підставляємо тут; час, рівень і traceback форматує фоновий потік
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_listener: QueueListener | None = None
+
+
+def setup_logging() -> QueueListener:
+    """Налаштовує кореневий логер: запис у файл і консоль виконує фоновий QueueListener."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    LOG_DIR.mkdir(exist_ok=True)
+
+    if settings.LOG_JSON:
+        formatter = JsonFormatter(datefmt=LOG_DATE_FORMAT)
+    else:
+        formatter = logging.Formatter(fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+
+    file_handler = RotatingFileHandler(
+        filename=LOG_DIR / "app.log",
+        maxBytes=5 * 1024 * 1024,
+        backupCount=2,
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(formatter)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    if settings.LOG_SAMPLING:
+        queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLING))
+
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        handlers=[queue_handler],
+        force=True,
+    )
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Дописує чергу і зупиняє фоновий потік логування."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 logger = logging.getLogger("FastapiApp")
 
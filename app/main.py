@@ -1,20 +1,145 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.auth.cache import user_cache, role_catalog
+from app.auth.dao import UsersDAO, RoleDAO
+from app.auth.hashing import password_hasher
+from app.auth.revocation import revocation_store
+from app.auth.schemas import EmailModel
+from app.auth.throttling import login_throttle
 from app.auth.router import router as router_auth
+from app.auth.utils import token_cache
 from app.admin.router import router as router_admin
-app = FastAPI()
-
-app.include_router(router_auth, prefix='/auth', tags=['Auth'])
-app.include_router(router_admin, prefix='/admin', tags=['Admin'])
+from app.config import settings
+from app.dao.batching import batch_loader
+from app.dao.database import async_session_maker, engine, get_pool_stats, replica_engines, session_router, \
+    warm_up_pool
+from app.dao.statements import statement_cache
+from app.exceptions import ServiceNotReadyException
+from app.logger import logger, setup_logging
+from app.metrics import REGISTRY, CONTENT_TYPE_LATEST
+from app.middleware import MetricsMiddleware, ReadYourWritesMiddleware, ServerTimingMiddleware
 
 origins = ['http://localhost:3000']
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "OPTIONS", "DELETE", "PATCH", 'PUT'],
-    allow_headers=["Content-Type", "Access-Control-Allow-Origin", "Access-Control-Allow-Headers", "Set-Cookie",
-                   "Authorization"],
-)
\ No newline at end of file
+# Запити, які обслуговують майже кожен виклик API: /auth/me, логін, адмінські списки
+HOT_QUERIES = (
+    lambda session: UsersDAO(session).find_one_or_none_by_id(data_id=0),
+    lambda session: UsersDAO(session).find_one_or_none(filters=EmailModel(email="warm-up@example.com")),
+    lambda session: UsersDAO(session).find_page(limit=1),
+    lambda session: RoleDAO(session).find_all(),
+)
+
+
+async def warm_up() -> None:
+    """Калібрує bcrypt, піднімає пул хешування, прогріває з'єднання з БД і завантажує ролі."""
+    await password_hasher.calibrate(
+        target_ms=settings.BCRYPT_TARGET_MS,
+        min_rounds=settings.BCRYPT_MIN_ROUNDS,
+        max_rounds=settings.BCRYPT_MAX_ROUNDS,
+        rounds=settings.BCRYPT_ROUNDS,
+    )
+    await password_hasher.warm_up()
+    connections = min(settings.DB_POOL_MIN_SIZE, settings.DB_POOL_SIZE)
+    await warm_up_pool(engine, connections, HOT_QUERIES)
+    async with async_session_maker() as session:
+        await role_catalog.load(session)
+    for replica_engine in replica_engines:
+        await warm_up_pool(replica_engine, connections, HOT_QUERIES)
+    logger.info("Прогрів завершено: %s з'єднань на рушій", connections)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up()
+    # Кожен воркер тримає власну копію відкликаних jti і підтягує нові записи з БД
+    background_tasks = [
+        asyncio.create_task(
+            revocation_store.run_sync_loop(async_session_maker, settings.REVOCATION_SYNC_INTERVAL)
+        ),
+        asyncio.create_task(
+            role_catalog.run_refresh_loop(async_session_maker, settings.ROLE_CATALOG_REFRESH_INTERVAL)
+        ),
+    ]
+    if replica_engines:
+        background_tasks.append(asyncio.create_task(
+            session_router.run_health_loop(settings.DB_REPLICA_HEALTH_INTERVAL)
+        ))
+    REGISTRY.start_flushing()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    REGISTRY.stop_flushing()
+    password_hasher.shutdown()
+    for db_engine in (engine, *replica_engines):
+        await db_engine.dispose()
+
+
+def register_metrics() -> None:
+    REGISTRY.register_stats("password_hasher", password_hasher.stats,
+                            keys=("in_flight", "queue_depth", "completed", "rejected", "latency_max_ms"))
+    REGISTRY.register_stats("user_cache", user_cache.stats,
+                            keys=("size", "hits", "misses", "evictions", "expirations"))
+    REGISTRY.register_stats("token_cache", token_cache.stats, keys=("size", "hits", "misses", "evictions"))
+    REGISTRY.register_stats("db_pool", get_pool_stats, keys=("size", "checked_out", "idle", "overflow"))
+    REGISTRY.register_stats("db_replicas", session_router.stats,
+                            keys=("healthy_replicas", "replica_reads", "primary_reads", "failovers"))
+    REGISTRY.register_stats("dao_statement_cache", statement_cache.stats, keys=("size", "hits", "misses"))
+    REGISTRY.register_stats("dao_batch_loader", batch_loader.stats, keys=("pending", "batches", "keys", "shared"))
+    REGISTRY.register_stats("token_revocation", revocation_store.stats, keys=("revoked", "checks", "rejected"))
+    REGISTRY.register_stats("login_throttle", login_throttle.stats,
+                            keys=("ip_keys", "ip_rejected", "email_keys", "email_rejected"))
+    REGISTRY.register_stats("role_catalog", role_catalog.stats, keys=("roles", "loads"))
+
+
+def create_app() -> FastAPI:
+    setup_logging()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.ready = False
+
+    app.include_router(router_auth, prefix='/auth', tags=['Auth'])
+    app.include_router(router_admin, prefix='/admin', tags=['Admin'])
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "OPTIONS", "DELETE", "PATCH", 'PUT'],
+        allow_headers=["Content-Type", "Access-Control-Allow-Origin", "Access-Control-Allow-Headers", "Set-Cookie",
+                       "Authorization"],
+    )
+    app.add_middleware(ServerTimingMiddleware)
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics() -> Response:
+        return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
+
+    @app.get("/ready", include_in_schema=False)
+    def ready(request: Request) -> dict:
+        """Readiness-проба: 200 лише після прогріву і до початку зупинки."""
+        if not request.app.state.ready:
+            raise ServiceNotReadyException
+        return {"status": "ready"}
+
+    return app
+
+
+register_metrics()
+
+
+def __getattr__(name: str):
+    # `uvicorn app.main:app` і `from app.main import app` створюють застосунок лише при першому зверненні
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
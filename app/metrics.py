@@ -0,0 +1,269 @@
+import json
+import os
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Sequence
+
+from app.config import settings
+
+# Межі кошиків у секундах, як у prometheus_client
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Гістограма з фіксованими кошиками; observe коштує один bisect."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {"buckets": buckets, "sum": round(self.sum, 6), "count": self.count}
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+
+    def export(self) -> dict:
+        return {
+            "kind": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "values": [[list(labels), self._export_value(value)] for labels, value in list(self._values.items())],
+        }
+
+    @staticmethod
+    def _export_value(value):
+        return value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, labels: tuple = ()) -> None:
+        self._values[labels] = value
+
+
+class LabeledHistogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        histogram = self._values.get(labels)
+        if histogram is None:
+            histogram = self._values[labels] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def export(self) -> dict:
+        exported = super().export()
+        exported["buckets"] = list(self.buckets)
+        return exported
+
+    @staticmethod
+    def _export_value(value: Histogram):
+        return [list(value.counts), value.sum, value.count]
+
+
+class MetricsRegistry:
+    """Реєстр метрик процесу з рендерингом у текстовий формат Prometheus.
+
+    Якщо задано multiproc_dir, кожен воркер періодично скидає свій стан у файл
+    {pid}.json, а /metrics будь-якого воркера підсумовує файли всіх процесів.
+    """
+
+    def __init__(self, multiproc_dir: str | None = None, flush_interval: float = 5.0):
+        self.multiproc_dir = Path(multiproc_dir) if multiproc_dir else None
+        self.flush_interval = flush_interval
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self._flush_thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def _register(self, metric: Metric) -> Metric:
+        # Повторна реєстрація (наприклад, при перебудові middleware) повертає вже існуючу метрику
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if existing.kind != metric.kind:
+                raise ValueError(f"Metric {metric.name} is already registered as {existing.kind}")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> LabeledHistogram:
+        return self._register(LabeledHistogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Колектор оновлює gauge-метрики безпосередньо перед експортом."""
+        self._collectors.append(collector)
+
+    def register_stats(self, prefix: str, stats: Callable[[], dict], keys: Sequence[str]) -> None:
+        """Публікує числові поля словника stats() як gauge-метрики {prefix}_{key}."""
+        gauges = {key: self.gauge(f"{prefix}_{key}", f"{prefix} {key}") for key in keys}
+
+        def collect() -> None:
+            values = stats()
+            for key, gauge in gauges.items():
+                gauge.set(values.get(key, 0))
+
+        self.add_collector(collect)
+
+    def export(self) -> dict:
+        for collector in self._collectors:
+            collector()
+        return {name: metric.export() for name, metric in list(self._metrics.items())}
+
+    def flush(self) -> None:
+        if self.multiproc_dir is None:
+            return
+        self.multiproc_dir.mkdir(parents=True, exist_ok=True)
+        target = self.multiproc_dir / f"{os.getpid()}.json"
+        tmp = target.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.export()), encoding="utf-8")
+        tmp.replace(target)
+
+    def start_flushing(self) -> None:
+        if self.multiproc_dir is None or self._flush_thread is not None:
+            return
+        self._stop.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._flush_thread.start()
+
+    def stop_flushing(self) -> None:
+        if self._flush_thread is not None:
+            self._stop.set()
+            self._flush_thread.join()
+            self._flush_thread = None
+            self.flush()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def collect(self) -> dict:
+        """Стан метрик: локальний або підсумований по всіх воркерах."""
+        if self.multiproc_dir is None:
+            return self.export()
+
+        self.flush()
+        merged: dict[str, dict] = {}
+        for path in self.multiproc_dir.glob("*.json"):
+            try:
+                state = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(int(path.stem)) if path.stem.isdigit() else False
+            _merge_state(merged, state, include_gauges=alive)
+        return merged
+
+    def render(self) -> str:
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['kind']}")
+            labelnames = metric["labelnames"]
+            for labels, value in metric["values"]:
+                if metric["kind"] == "histogram":
+                    counts, total, count = value
+                    cumulative = 0
+                    for bound, bucket_count in zip(metric["buckets"], counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le=bound)} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le='+Inf')} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {total}")
+                    lines.append(f"{name}_count{_format_labels(labelnames, labels)} {count}")
+                else:
+                    lines.append(f"{name}{_format_labels(labelnames, labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge_state(merged: dict, state: dict, include_gauges: bool) -> None:
+    for name, metric in state.items():
+        # Gauge мертвого воркера (наприклад, in-flight) більше не актуальний, лічильники зберігаємо
+        if metric["kind"] == "gauge" and not include_gauges:
+            continue
+        target = merged.setdefault(name, {**metric, "values": []})
+        index = {tuple(labels): position for position, (labels, _) in enumerate(target["values"])}
+        for labels, value in metric["values"]:
+            position = index.get(tuple(labels))
+            if position is None:
+                index[tuple(labels)] = len(target["values"])
+                target["values"].append([labels, value])
+            elif metric["kind"] == "histogram":
+                counts, total, count = target["values"][position][1]
+                target["values"][position][1] = [
+                    [a + b for a, b in zip(counts, value[0])], total + value[1], count + value[2]
+                ]
+            else:
+                target["values"][position][1] += value
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], labels: Sequence, **extra) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra.items())
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+REGISTRY = MetricsRegistry(
+    multiproc_dir=settings.METRICS_MULTIPROC_DIR,
+    flush_interval=settings.METRICS_FLUSH_INTERVAL,
+)
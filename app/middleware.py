@@ -0,0 +1,117 @@
+import math
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.dao.profiling import track_queries
+from app.dao.routing import READ_PRIMARY_COOKIE
+from app.metrics import REGISTRY, SIZE_BUCKETS, MetricsRegistry
+
+
+class MetricsMiddleware:
+    """ASGI middleware із метриками запитів за шаблоном маршруту."""
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = REGISTRY):
+        self.app = app
+        self.requests_total = registry.counter(
+            "http_requests_total", "Total HTTP requests", ("method", "route", "status"))
+        self.request_duration = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+        self.request_size = registry.histogram(
+            "http_request_size_bytes", "HTTP request body size", ("method", "route"), buckets=SIZE_BUCKETS)
+        self.response_size = registry.histogram(
+            "http_response_size_bytes", "HTTP response body size", ("method", "route"), buckets=SIZE_BUCKETS)
+        self.in_progress = registry.gauge(
+            "http_requests_in_progress", "HTTP requests currently being served", ("method",))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        method = scope["method"]
+        status = 500
+        request_size = 0
+        response_size = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal request_size
+            message = await receive()
+            request_size += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, response_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        self.in_progress.inc((method,))
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            self.in_progress.dec((method,))
+            # FastAPI кладе знайдений маршрут у scope; шаблон шляху обмежує кардинальність міток
+            route = scope.get("route")
+            labels = (method, route.path if route is not None else "<unmatched>")
+            self.request_duration.observe(time.perf_counter() - started, labels)
+            self.request_size.observe(request_size, labels)
+            self.response_size.observe(response_size, labels)
+            self.requests_total.inc((*labels, str(status)))
+
+
+class ServerTimingMiddleware:
+    """Рахує SQL-запити кожного HTTP-запиту і додає заголовок Server-Timing."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(budget=settings.DB_QUERY_BUDGET) as stats:
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing",
+                                   f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"')
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+class ReadYourWritesMiddleware:
+    """Ставить куку READ_PRIMARY_COOKIE, якщо запит записав дані (request.state.read_primary_until).
+
+    Кука короткоживуча: поки вона діє, get_read_session на будь-якому воркері читає з primary.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Request.state зберігається в scope["state"]; створюємо його тут, щоб бачити той самий словник
+        state = scope.setdefault("state", {})
+
+        async def send_wrapper(message: Message) -> None:
+            primary_until = state.get("read_primary_until")
+            if message["type"] == "http.response.start" and primary_until is not None:
+                max_age = max(1, math.ceil(primary_until - time.time()))
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{READ_PRIMARY_COOKIE}={primary_until:.3f}; Max-Age={max_age}; Path=/; HttpOnly; SameSite=lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
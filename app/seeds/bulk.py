@@ -0,0 +1,201 @@
+"""Масове заповнення БД синтетичними користувачами.
+
+    python -m app.seeds.bulk --users 1000000 --seed 42
+    python -m app.seeds.bulk --users 10000000 --batch-size 50000
+
+Усі користувачі отримують роль 1: пароль у них спільний і відомий, тож роль адміністратора (2)
+з'являється лише з явним --roles, наприклад --roles 1=0.99,2=0.01.
+
+Дані детерміновані: користувач з номером i однаковий для того самого --seed незалежно від
+розміру пакета. Повторний запуск продовжує після найбільшого номера, вже записаного в домені
+--domain, а ON CONFLICT DO NOTHING робить повтор пакета безпечним. На PostgreSQL (asyncpg)
+пакети йдуть через COPY у тимчасову таблицю, на інших СУБД — пакетним INSERT.
+"""
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+from typing import Iterator, Sequence
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.auth.dao import RoleDAO
+from app.auth.hashing import get_password_hash
+from app.auth.models import User
+from app.auth.permissions import Permission
+from app.auth.schemas import SAddRole
+from app.config import settings
+from app.dao.database import build_engine
+from app.logger import logger, setup_logging
+
+USER_COLUMNS = ("email", "phone_number", "first_name", "last_name", "password", "role_id")
+# Розмір блоку для генератора випадкових чисел: не залежить від --batch-size, тож дані детерміновані
+RNG_BLOCK = 1000
+DEFAULT_ROLES = {1: 1.0}
+
+FIRST_NAMES = ("Olena", "Taras", "Iryna", "Andrii", "Oksana", "Dmytro", "Natalia", "Serhii", "Yulia", "Bohdan",
+               "Kateryna", "Mykola", "Sofia", "Volodymyr", "Anna", "Oleksii", "Mariia", "Ivan", "Daria", "Roman")
+LAST_NAMES = ("Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Melnyk", "Oliinyk", "Shevchuk",
+              "Polishchuk", "Lysenko", "Marchenko", "Rudenko", "Savchenko", "Petrenko", "Kuzmenko", "Moroz")
+
+_STAGING_TABLE = """
+    CREATE TEMP TABLE IF NOT EXISTS seed_users (
+        email text, phone_number text, first_name text, last_name text, password text, role_id integer
+    ) ON COMMIT DELETE ROWS
+"""
+_COLUMNS_SQL = ", ".join(USER_COLUMNS)
+_MERGE_STAGING = f"INSERT INTO users ({_COLUMNS_SQL}) SELECT {_COLUMNS_SQL} FROM seed_users ON CONFLICT DO NOTHING"
+
+
+def parse_roles(value: str) -> dict[int, float]:
+    """'1=0.99,2=0.01' -> {1: 0.99, 2: 0.01}."""
+    roles = {}
+    for part in value.split(","):
+        role_id, weight = part.split("=")
+        roles[int(role_id)] = float(weight)
+    return roles
+
+
+def generate_users(seed: int, start: int, stop: int, password_hash: str, roles: dict[int, float],
+                   domain: str) -> Iterator[tuple]:
+    """Користувачі з номерами [start, stop) у порядку USER_COLUMNS."""
+    role_ids, weights = list(roles), list(roles.values())
+    for block in range(start // RNG_BLOCK, math.ceil(stop / RNG_BLOCK)):
+        rng = random.Random(f"{seed}:{block}")
+        first = block * RNG_BLOCK
+        for index in range(first, first + RNG_BLOCK):
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            role_id = rng.choices(role_ids, weights)[0]
+            if index < start or index >= stop:
+                continue
+            yield (
+                f"{first_name}.{last_name}.{index}@{domain}".lower(),
+                f"+380{index:09d}",
+                first_name,
+                last_name,
+                password_hash,
+                role_id,
+            )
+
+
+def seeded_index(email: str, phone_number: str, domain: str) -> int | None:
+    """Номер згенерованого користувача або None для рядка, що не створений генератором."""
+    local, _, email_domain = email.rpartition("@")
+    index = local.rpartition(".")[2]
+    if email_domain != domain or not index.isdigit() or phone_number != f"+380{int(index):09d}":
+        return None
+    return int(index)
+
+
+async def seeded_until(engine: AsyncEngine, domain: str) -> int:
+    """Номер, з якого продовжувати: наступний після найбільшого записаного.
+
+    Кількість рядків домену тут не годиться: чужі адреси в домені й пропущені через конфлікт
+    номери зсували б її відносно номерів. Телефон несе номер з нулями попереду, тож найбільший
+    номер — серед перших рядків за спаданням телефону; рядки не від генератора пропускаються.
+    """
+    async with engine.connect() as conn:
+        query = (
+            select(User.email, User.phone_number)
+            .where(User.email.like(f"%@{domain}"), User.phone_number.like("+380%"))
+            .order_by(User.phone_number.desc())
+            .execution_options(yield_per=1000)
+        )
+        result = await conn.stream(query)
+        async for email, phone_number in result:
+            index = seeded_index(email, phone_number, domain)
+            if index is not None:
+                await result.close()
+                return index + 1
+    return 0
+
+
+async def ensure_roles(engine: AsyncEngine) -> None:
+    async with AsyncSession(engine) as session:
+        await RoleDAO(session).upsert_many([
+            SAddRole(id=1, name="User"),
+            SAddRole(id=2, name="Admin", permissions=Permission.ADMIN),
+        ])
+        await session.commit()
+
+
+async def _copy_batch(conn: AsyncConnection, rows: Sequence[tuple]) -> int:
+    # Спершу SQL через SQLAlchemy, щоб COPY потрапив у вже відкриту транзакцію
+    await conn.execute(text(_STAGING_TABLE))
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table("seed_users", records=rows, columns=USER_COLUMNS)
+    return (await conn.execute(text(_MERGE_STAGING))).rowcount
+
+
+async def _insert_batch(conn: AsyncConnection, rows: Sequence[tuple]) -> int:
+    if conn.dialect.name == "postgresql":
+        query = postgresql.insert(User).on_conflict_do_nothing()
+    elif conn.dialect.name == "sqlite":
+        query = sqlite.insert(User).on_conflict_do_nothing()
+    else:
+        query = insert(User)
+    result = await conn.execute(query, [dict(zip(USER_COLUMNS, row)) for row in rows])
+    return result.rowcount
+
+
+async def seed_users(engine: AsyncEngine, users: int, seed: int = 42, batch_size: int = 10_000,
+                     password: str = "password123", roles: dict[int, float] | None = None,
+                     domain: str = "seed.example.com") -> int:
+    """Доводить кількість користувачів домену до users; повертає кількість доданих."""
+    roles = roles or DEFAULT_ROLES
+    await ensure_roles(engine)
+    start = await seeded_until(engine, domain)
+    if start >= users:
+        logger.info("Користувачі @%s уже записані до номера %s, нічого робити.", domain, start)
+        return 0
+
+    use_copy = engine.dialect.name == "postgresql" and engine.dialect.driver == "asyncpg"
+    write_batch = _copy_batch if use_copy else _insert_batch
+    password_hash = get_password_hash(password, settings.BCRYPT_ROUNDS)
+    logger.info("Заповнення користувачів %s..%s (%s), пакет %s", start, users, "COPY" if use_copy else "INSERT",
+                batch_size)
+
+    inserted, started = 0, time.perf_counter()
+    rows = generate_users(seed, start, users, password_hash, roles, domain)
+    for batch_start in range(start, users, batch_size):
+        batch = [next(rows) for _ in range(min(batch_size, users - batch_start))]
+        # Кожен пакет — окрема транзакція: обірваний запуск продовжується з останнього коміту
+        async with engine.begin() as conn:
+            inserted += await write_batch(conn, batch)
+        done = batch_start + len(batch)
+        logger.info("Записано %s/%s користувачів, %.0f рядків/с", done, users,
+                    (done - start) / (time.perf_counter() - started))
+    return inserted
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic users")
+    parser.add_argument("--users", type=int, required=True, help="Total number of seeded users to reach")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--password", default="password123", help="Password shared by all seeded users")
+    parser.add_argument("--roles", type=parse_roles, default=DEFAULT_ROLES,
+                        help="Role distribution as role_id=weight pairs, e.g. 1=0.99,2=0.01; only role 1 by default")
+    parser.add_argument("--domain", default="seed.example.com", help="Email domain that marks seeded users")
+    parser.add_argument("--db-url", help="Database URL; settings.DB_URL by default")
+    return parser.parse_args(argv)
+
+
+async def main(args: argparse.Namespace) -> int:
+    engine = build_engine(args.db_url or settings.DB_URL)
+    try:
+        inserted = await seed_users(engine, args.users, seed=args.seed, batch_size=args.batch_size,
+                                    password=args.password, roles=args.roles, domain=args.domain)
+    finally:
+        await engine.dispose()
+    logger.info("Додано %s користувачів.", inserted)
+    return 0
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(asyncio.run(main(parse_args())))
@@ -2,6 +2,7 @@ import asyncio
 from sqlalchemy import select
 from app.dao.database import async_session_maker
 from app.auth.models import Role, User
+from app.auth.permissions import Permission
 
 async def seed():
     async with async_session_maker() as session:
@@ -16,7 +17,7 @@ async def seed():
         result = await session.execute(select(Role).filter_by(name="Admin"))
         admin_role = result.scalar_one_or_none()
         if not admin_role:
-            admin_role = Role(id=2, name="Admin")
+            admin_role = Role(id=2, name="Admin", permissions=Permission.ADMIN)
             session.add(admin_role)
             await session.commit()
 
@@ -0,0 +1,86 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable
+
+import orjson
+from fastapi.responses import JSONResponse
+from sqlalchemy import inspect
+
+
+def _to_iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _to_float(value):
+    return float(value) if value is not None else None
+
+
+def _to_str(value):
+    return str(value) if value is not None else None
+
+
+def _convert_any(value):
+    """Для колонок без відомого python_type: ті самі перевірки, що й раніше в to_dict."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+# Ті самі типи, що й у колишньому to_dict: date і time повертаються як є
+_CONVERTERS: dict[type, Callable[[Any], Any]] = {
+    datetime: _to_iso,
+    Decimal: _to_float,
+    uuid.UUID: _to_str,
+}
+_SAFE_TYPES = (int, str, bool, float)
+
+_serializers: dict[type, tuple[tuple[str, Callable | None], ...]] = {}
+
+
+def _column_converter(column) -> Callable | None:
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return _convert_any
+    if python_type in _CONVERTERS:
+        return _CONVERTERS[python_type]
+    if issubclass(python_type, _SAFE_TYPES):
+        return None
+    return _convert_any
+
+
+def get_serializer(model: type) -> tuple[tuple[str, Callable | None], ...]:
+    """Колонки моделі з конвертерами, обчислені один раз на клас."""
+    fields = _serializers.get(model)
+    if fields is None:
+        fields = _serializers[model] = tuple(
+            (column.key, _column_converter(column)) for column in inspect(model).columns
+        )
+    return fields
+
+
+def model_to_dict(instance, exclude_none: bool = False) -> dict:
+    result = {}
+    for key, convert in get_serializer(type(instance)):
+        value = getattr(instance, key)
+        if convert is not None:
+            value = convert(value)
+        if not exclude_none or value is not None:
+            result[key] = value
+    return result
+
+
+def json_dumps(content: Any) -> bytes:
+    return orjson.dumps(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse для вже готових dict/list: без jsonable_encoder і валідації моделі відповіді."""
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
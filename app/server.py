@@ -0,0 +1,120 @@
+"""Продакшн-запуск: `python -m app.server`.
+
+Кількість воркерів визначається за доступними CPU, а глобальний бюджет з'єднань з БД
+(DB_CONNECTION_BUDGET) ділиться між воркерами через змінні оточення DB_POOL_SIZE і
+DB_MAX_OVERFLOW, які успадковують процеси воркерів. Так само один раз калібрується
+вартість bcrypt (BCRYPT_ROUNDS), щоб усі воркери хешували однаково, а для кількох
+воркерів задається спільний каталог метрик (METRICS_MULTIPROC_DIR).
+"""
+import importlib.util
+import math
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import uvicorn
+
+from app.auth.hashing import calibrate_bcrypt_rounds
+from app.config import settings
+from app.logger import logger, setup_logging
+
+
+@dataclass(frozen=True)
+class WorkerPlan:
+    workers: int
+    pool_size: int
+    max_overflow: int
+
+
+def available_cpus() -> int:
+    # sched_getaffinity враховує обмеження контейнера/cpuset, cpu_count — ні
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def plan_workers(cpus: int, workers: int | None, budget: int | None,
+                 pool_size: int, max_overflow: int) -> WorkerPlan:
+    """Розраховує воркери і пул кожного з них так, щоб сума з'єднань не перевищила budget."""
+    workers = workers or cpus
+    if budget is None:
+        return WorkerPlan(workers, pool_size, max_overflow)
+
+    if budget < workers:
+        logger.warning("Бюджету в %s з'єднань не вистачає на %s воркерів, запускаємо %s",
+                       budget, workers, budget)
+        workers = max(1, budget)
+    per_worker = budget // workers
+    # Дві третини — постійний пул, решта — overflow для сплесків
+    worker_pool = max(1, math.ceil(per_worker * 2 / 3))
+    return WorkerPlan(workers, worker_pool, max(0, per_worker - worker_pool))
+
+
+def bcrypt_rounds() -> int:
+    """BCRYPT_ROUNDS або калібрування на ще не навантаженому CPU, до старту воркерів."""
+    if settings.BCRYPT_ROUNDS is not None:
+        return settings.BCRYPT_ROUNDS
+    return calibrate_bcrypt_rounds(settings.BCRYPT_TARGET_MS, settings.BCRYPT_MIN_ROUNDS, settings.BCRYPT_MAX_ROUNDS)
+
+
+def metrics_dir(workers: int) -> str | None:
+    """Каталог метрик для воркерів, очищений від файлів попереднього запуску."""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if directory is None:
+        if workers <= 1:
+            return None
+        # Без спільного каталогу /metrics показував би лише воркер, що прийняв запит
+        directory = tempfile.mkdtemp(prefix="metrics-")
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    # Лічильники завершених процесів минулого запуску інакше додавалися б до нових
+    for stale in path.glob("*.json"):
+        stale.unlink(missing_ok=True)
+    return directory
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def main() -> None:
+    setup_logging()
+    plan = plan_workers(
+        cpus=available_cpus(),
+        workers=settings.WEB_WORKERS,
+        budget=settings.DB_CONNECTION_BUDGET,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+    )
+    os.environ["DB_POOL_SIZE"] = str(plan.pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(plan.max_overflow)
+    # Воркери з різною вартістю перехешовували б паролі один за одним при кожному вході
+    os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds())
+    multiproc_dir = metrics_dir(plan.workers)
+    if multiproc_dir is not None:
+        os.environ["METRICS_MULTIPROC_DIR"] = multiproc_dir
+
+    loop = "uvloop" if _available("uvloop") else "asyncio"
+    http = "httptools" if _available("httptools") else "h11"
+    logger.info("Старт: %s воркерів, пул %s + %s на воркер, loop=%s, http=%s",
+                plan.workers, plan.pool_size, plan.max_overflow, loop, http)
+
+    # SIGTERM uvicorn обробляє сам: перестає приймати з'єднання, чекає активні запити
+    # до WEB_GRACEFUL_TIMEOUT секунд і запускає lifespan shutdown у кожному воркері
+    uvicorn.run(
+        "app.main:app",
+        host=settings.WEB_HOST,
+        port=settings.WEB_PORT,
+        workers=plan.workers,
+        loop=loop,
+        http=http,
+        proxy_headers=True,
+        timeout_keep_alive=settings.WEB_KEEPALIVE,
+        timeout_graceful_shutdown=settings.WEB_GRACEFUL_TIMEOUT,
+        log_config=None,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""Навантажувальний бенчмарк auth API.
+
+Запускає реальний ASGI-застосунок через httpx поверх локальної БД (SQLite за замовчуванням
+або локальний Postgres через --db-url), проганяє сценарії й порівнює результат з базовим.
+
+    python -m benchmarks.run --users 1000 --requests 2000 --output bench.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.15
+    python -m benchmarks.run --db-url postgresql+asyncpg://localhost/bench --reuse-db --users 100000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import AsyncGenerator, Awaitable, Callable
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.auth.cache import role_catalog
+from app.auth.dao import RoleDAO, UsersDAO
+from app.auth.hashing import get_password_hash
+from app.auth.models import User
+from app.auth.permissions import Permission
+from app.auth.schemas import EmailModel, SAddRole, SUserAddDB
+from app.auth.throttling import login_throttle
+from app.auth.utils import create_tokens
+from app.dao.database import Base
+from app.dao.profiling import instrument_engine
+from app.dependencies.dao_dep import get_session_with_commit, get_session_without_commit, get_read_session
+from app.main import app
+
+BENCH_PASSWORD = "benchmark-password"
+ADMIN_EMAIL = "bench-admin@example.com"
+SCENARIOS = ("login_storm", "me_polling", "refresh_cycle", "admin_listing", "mixed")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class Recorder:
+    """Збирає латентності й помилки по ендпоінтах одного сценарію."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, endpoint: str, request: Awaitable[httpx.Response]) -> httpx.Response:
+        started = time.perf_counter()
+        response = await request
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[endpoint] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, values in self.latencies.items():
+            values.sort()
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {"elapsed_s": round(elapsed, 3), "rps": round(total / elapsed, 2), "endpoints": endpoints}
+
+
+class SBenchUser(SUserAddDB):
+    role_id: int = 1
+
+
+async def ensure_admin(session: AsyncSession, password_hash: str) -> int:
+    """Ролі й адміністратор бенчмарка: від його імені йдуть запити admin_listing."""
+    await RoleDAO(session).upsert_many([SAddRole(id=1, name="User"), SAddRole(id=2, name="Admin", permissions=Permission.ADMIN)])
+    await UsersDAO(session).upsert_many([
+        SBenchUser(email=ADMIN_EMAIL, phone_number=f"+3809{0:08d}", first_name="Bench", last_name="Admin",
+                   password=password_hash, role_id=2)
+    ])
+    await session.commit()
+    admin = await UsersDAO(session).find_one_or_none(filters=EmailModel(email=ADMIN_EMAIL))
+    return admin.id
+
+
+async def seed_database(session_maker: async_sessionmaker, users: int) -> tuple[dict[int, str], int]:
+    """Створює ролі, адміністратора і `users` користувачів з одним заздалегідь обчисленим хешем."""
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    emails = [f"bench-user-{i}@example.com" for i in range(users)]
+    async with session_maker() as session:
+        admin_id = await ensure_admin(session, password_hash)
+        await UsersDAO(session).upsert_many([
+            SBenchUser(email=email, phone_number=f"+3809{i:08d}", first_name="Bench", last_name="User",
+                       password=password_hash, role_id=1)
+            for i, email in enumerate(emails, start=1)
+        ])
+        await session.commit()
+        await role_catalog.load(session)
+    return await load_users(session_maker, users, "bench-user-%@example.com"), admin_id
+
+
+async def load_users(session_maker: async_sessionmaker, users: int, email_pattern: str) -> dict[int, str]:
+    """Перші `users` користувачів, чий email відповідає LIKE-шаблону: id -> email."""
+    async with session_maker() as session:
+        result = await session.execute(
+            select(User.id, User.email).where(User.email.like(email_pattern)).order_by(User.id).limit(users)
+        )
+        return dict(result.all())
+
+
+async def use_seeded_database(session_maker: async_sessionmaker, users: int, domain: str) -> tuple[dict[int, str], int]:
+    """Користувачі, заздалегідь записані app.seeds.bulk; таблиці не перестворюються."""
+    async with session_maker() as session:
+        admin_id = await ensure_admin(session, get_password_hash(BENCH_PASSWORD))
+        await role_catalog.load(session)
+    seeded = await load_users(session_maker, users, f"%@{domain}")
+    if len(seeded) < users:
+        print(f"Only {len(seeded)} of {users} users are seeded in @{domain}", file=sys.stderr)
+    return seeded, admin_id
+
+
+def override_sessions(session_maker: async_sessionmaker) -> None:
+    async def with_commit() -> AsyncGenerator[AsyncSession, None]:
+        async with session_maker() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def without_commit() -> AsyncGenerator[AsyncSession, None]:
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_session_with_commit] = with_commit
+    app.dependency_overrides[get_session_without_commit] = without_commit
+    app.dependency_overrides[get_read_session] = without_commit
+
+
+def cookie_header(**cookies: str) -> dict:
+    return {"Cookie": "; ".join(f"{name}={value}" for name, value in cookies.items())}
+
+
+def issue_tokens(user_ids: list[int]) -> dict[int, dict]:
+    """Одна пара токенів на змодельованого користувача, як після його входу в систему."""
+    return {user_id: create_tokens({"sub": str(user_id)}) for user_id in user_ids}
+
+
+async def run_scenario(name: str, client: httpx.AsyncClient, emails: list[str], password: str, admin_id: int,
+                       user_tokens: dict[int, dict], total_requests: int, concurrency: int, seed: int) -> dict:
+    recorder = Recorder()
+    rng = random.Random(seed)
+    user_ids = list(user_tokens)
+
+    async def login() -> None:
+        await recorder.call("POST /auth/login/", client.post(
+            "/auth/login/", json={"email": rng.choice(emails), "password": password}))
+
+    # Клієнти повторно надсилають ті самі токени, тож кеш розбору токенів працює як у продакшні
+    async def me() -> None:
+        tokens = user_tokens[rng.choice(user_ids)]
+        await recorder.call("GET /auth/me/", client.get(
+            "/auth/me/", headers=cookie_header(user_access_token=tokens["access_token"])))
+
+    async def refresh() -> None:
+        tokens = user_tokens[rng.choice(user_ids)]
+        await recorder.call("POST /auth/refresh", client.post(
+            "/auth/refresh", headers=cookie_header(user_refresh_token=tokens["refresh_token"])))
+
+    admin_cookies = cookie_header(user_access_token=create_tokens({"sub": str(admin_id)})["access_token"])
+
+    async def admin_listing() -> None:
+        await recorder.call("GET /admin/all_users/", client.get(
+            "/admin/all_users/", params={"limit": 100}, headers=admin_cookies))
+
+    actions: dict[str, list[tuple[Callable[[], Awaitable[None]], int]]] = {
+        "login_storm": [(login, 1)],
+        "me_polling": [(me, 1)],
+        "refresh_cycle": [(refresh, 1)],
+        "admin_listing": [(admin_listing, 1)],
+        # Реалістична суміш: переважно опитування /me, зрідка логіни й адмінка
+        "mixed": [(me, 80), (refresh, 10), (login, 5), (admin_listing, 5)],
+    }
+    funcs, weights = zip(*actions[name])
+
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            await rng.choices(funcs, weights)[0]()
+
+    per_worker = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0)
+                  for i in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(count) for count in per_worker))
+    return recorder.report(time.perf_counter() - started)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Повертає список регресій: p95 вище або RPS нижче за базовий більше ніж на tolerance."""
+    regressions = []
+    for scenario, current in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base:
+            continue
+        for endpoint, stats in current["endpoints"].items():
+            base_stats = base["endpoints"].get(endpoint)
+            if not base_stats:
+                continue
+            if stats["p95_ms"] > base_stats["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{scenario} {endpoint}: p95 {stats['p95_ms']}ms > "
+                                   f"baseline {base_stats['p95_ms']}ms")
+            if stats["rps"] < base_stats["rps"] * (1 - tolerance):
+                regressions.append(f"{scenario} {endpoint}: rps {stats['rps']} < baseline {base_stats['rps']}")
+    return regressions
+
+
+def print_report(results: dict) -> None:
+    header = f"{'scenario':<15} {'endpoint':<24} {'reqs':>6} {'err':>5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}"
+    print(header)
+    print("-" * len(header))
+    for scenario, report in results["scenarios"].items():
+        for endpoint, stats in report["endpoints"].items():
+            print(f"{scenario:<15} {endpoint:<24} {stats['requests']:>6} {stats['errors']:>5} "
+                  f"{stats['rps']:>9} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+
+
+async def main(args: argparse.Namespace) -> int:
+    # Логи DAO на рівні INFO спотворюють результати, тому за замовчуванням вони приглушені
+    logging.getLogger().setLevel(args.log_level)
+    if args.reuse_db and not args.db_url:
+        print("--reuse-db needs --db-url of a database seeded with app.seeds.bulk", file=sys.stderr)
+        return 2
+    # drop_all нижче стирає схему, тож чужу БД чіпаємо лише з явним --reset-db
+    if args.db_url and not (args.reset_db or args.reuse_db):
+        print(f"Refusing to reset {args.db_url}: pass --reset-db to drop and recreate its tables "
+              f"or --reuse-db to benchmark the users already seeded there", file=sys.stderr)
+        return 2
+    db_url = args.db_url or f"sqlite+aiosqlite:///{Path(tempfile.mkdtemp()) / 'bench.db'}"
+    engine = create_async_engine(db_url)
+    instrument_engine(engine)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    if args.reuse_db:
+        users, admin_id = await use_seeded_database(session_maker, args.users, args.seed_domain)
+        password = args.seed_password
+    else:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        users, admin_id = await seed_database(session_maker, args.users)
+        password = BENCH_PASSWORD
+    emails = list(users.values())
+    user_tokens = issue_tokens(list(users))
+    # Усі запити бенчмарка йдуть з одного IP, тож обмеження логінів вимірювало б лише 429
+    login_throttle.enabled = args.login_throttling
+    override_sessions(session_maker)
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "db": engine.dialect.name,
+            "users": len(users),
+            "reused_db": args.reuse_db,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "login_throttling": args.login_throttling,
+        },
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for scenario in args.scenarios:
+            # Логіни впираються в bcrypt, тому для них кількість запитів менша
+            total = max(args.concurrency, args.requests // 10) if scenario == "login_storm" else args.requests
+            results["scenarios"][scenario] = await run_scenario(
+                scenario, client, emails, password, admin_id, user_tokens, total, args.concurrency, args.seed)
+
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+    print_report(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.baseline and Path(args.baseline).exists():
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            return 1
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Auth API load test")
+    parser.add_argument("--db-url", help="Database URL; temporary SQLite file by default")
+    reset = parser.add_mutually_exclusive_group()
+    reset.add_argument("--reset-db", action="store_true",
+                       help="Allow dropping and recreating all tables of the database given by --db-url")
+    reset.add_argument("--reuse-db", action="store_true",
+                       help="Keep the tables of --db-url and benchmark users seeded by app.seeds.bulk")
+    parser.add_argument("--seed-domain", default="seed.example.com", help="Email domain of the seeded users")
+    parser.add_argument("--seed-password", default="password123", help="Password the seeded users share")
+    parser.add_argument("--users", type=int, default=1000, help="Number of seeded users")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare with results stored in this file")
+    parser.add_argument("--save-baseline", help="Store results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--login-throttling", action="store_true", help="Keep the login rate limiter enabled")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
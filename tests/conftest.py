@@ -6,14 +6,19 @@ from sqlalchemy.orm import sessionmaker
 from typing import AsyncGenerator
 
 from app.main import app
+from app.auth.cache import user_cache, role_catalog
+from app.auth.throttling import login_throttle
+from app.auth.utils import token_cache
 from app.dao.database import Base
-from app.dependencies.dao_dep import get_session_with_commit, get_session_without_commit
+from app.dao.profiling import instrument_engine
+from app.dependencies.dao_dep import get_session_with_commit, get_session_without_commit, get_read_session
 
 # Test database URL - using SQLite for tests
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 # Create test engine and session
 test_engine = create_async_engine(TEST_DATABASE_URL)
+instrument_engine(test_engine)
 TestingSessionLocal = sessionmaker(
     test_engine, class_=AsyncSession, expire_on_commit=False
 )
@@ -53,6 +58,11 @@ async def client(db_session) -> AsyncGenerator[AsyncClient, None]:
 
     app.dependency_overrides[get_session_with_commit] = override_get_session_with_commit
     app.dependency_overrides[get_session_without_commit] = override_get_session_without_commit
+    app.dependency_overrides[get_read_session] = override_get_session_without_commit
+    user_cache.clear()
+    role_catalog.clear()
+    token_cache.clear()
+    login_throttle.clear()
 
     async with AsyncClient(app=app, base_url="http://test") as client:
         yield client
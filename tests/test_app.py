@@ -0,0 +1,42 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.main as main
+from app.auth.hashing import password_hasher, pwd_context
+from app.config import settings
+from app.dao.database import Base, build_engine, get_pool_stats
+
+
+@pytest.fixture
+async def warm_engine(tmp_path, monkeypatch):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(main, "engine", engine)
+    monkeypatch.setattr(main, "replica_engines", [])
+    monkeypatch.setattr(main, "async_session_maker", async_sessionmaker(engine, class_=AsyncSession))
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    saved_context = pwd_context.to_dict()
+    yield engine
+    pwd_context.load(saved_context)
+    password_hasher.rounds = None
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_create_app_reports_ready_only_after_warm_up(warm_engine):
+    app = main.create_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/ready")
+        assert response.status_code == 503
+
+        async with app.router.lifespan_context(app):
+            assert get_pool_stats(warm_engine)["idle"] == min(settings.DB_POOL_MIN_SIZE, settings.DB_POOL_SIZE)
+            assert password_hasher.rounds == 4
+
+            response = await client.get("/ready")
+            assert response.status_code == 200
+
+        response = await client.get("/ready")
+        assert response.status_code == 503
@@ -1,10 +1,14 @@
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import delete, select
+from sqlalchemy import delete, insert, select, update
 
 from app.auth.models import Role, User
+from app.auth.cache import role_catalog, user_cache
 from app.auth.dao import RoleDAO
+from app.auth.permissions import Permission
+from app.auth.hashing import password_hasher, pwd_context
+from app.config import settings
 from tests.schemas import RoleCreate
 
 # Test data
@@ -22,6 +26,14 @@ async def clean_roles(db_session: AsyncSession):
     await db_session.execute(delete(Role))
     await db_session.commit()
 
+@pytest.fixture
+async def clean_users(db_session: AsyncSession):
+    # For tests that commit users: the in-memory database is shared by the whole run
+    yield
+    await db_session.rollback()
+    await db_session.execute(delete(User))
+    await db_session.commit()
+
 @pytest.fixture
 async def default_role(db_session: AsyncSession):
     role_dao = RoleDAO(db_session)
@@ -61,6 +73,15 @@ async def test_register_duplicate_user(client: AsyncClient, default_role):
     assert response.status_code == 409
     assert "already exists" in response.json().get("detail", "")
 
+@pytest.mark.asyncio
+async def test_register_duplicate_phone_number(client: AsyncClient, default_role):
+    await client.post("/auth/register/", json=test_user_data)
+
+    response = await client.post("/auth/register/", json={**test_user_data, "email": "other@example.com"})
+
+    assert response.status_code == 409
+    assert "already exists" in response.json().get("detail", "")
+
 @pytest.mark.asyncio
 async def test_login_user(client: AsyncClient, default_role):
     # Register a user first
@@ -96,6 +117,48 @@ async def test_login_invalid_credentials(client: AsyncClient, default_role):
     assert response.status_code == 400
     assert "Incorrect email or password" in response.json().get("detail", "")
 
+@pytest.mark.asyncio
+async def test_login_rehashes_password_with_new_cost(client: AsyncClient, db_session: AsyncSession, default_role):
+    saved_context = pwd_context.to_dict()
+    try:
+        password_hasher.set_rounds(4)
+        await client.post("/auth/register/", json=test_user_data)
+        login_response = await client.post("/auth/login/", json={
+            "email": test_user_data["email"],
+            "password": test_user_data["password"]
+        })
+        cookies = {"user_access_token": login_response.cookies["user_access_token"]}
+        etag = (await client.get("/auth/me/", cookies=cookies)).headers["ETag"]
+
+        password_hasher.set_rounds(5)
+        response = await client.post("/auth/login/", json={
+            "email": test_user_data["email"],
+            "password": test_user_data["password"]
+        })
+        assert response.status_code == 200
+        # The rehash bumps the row version, so the cached snapshot must not keep the old ETag
+        assert (await client.get("/auth/me/", cookies=cookies)).headers["ETag"] != etag
+
+        user = (await db_session.execute(select(User).filter_by(email=test_user_data["email"]))).scalar_one()
+        await db_session.refresh(user)
+        assert user.password.startswith("$2b$05$")
+    finally:
+        pwd_context.load(saved_context)
+        password_hasher.rounds = None
+
+@pytest.mark.asyncio
+async def test_login_flood_is_throttled(client: AsyncClient, default_role):
+    await client.post("/auth/register/", json=test_user_data)
+    credentials = {"email": test_user_data["email"], "password": "WrongPassword"}
+
+    statuses = [(await client.post("/auth/login/", json=credentials)).status_code
+                for _ in range(settings.LOGIN_BURST_PER_EMAIL)]
+    assert statuses == [400] * settings.LOGIN_BURST_PER_EMAIL
+
+    response = await client.post("/auth/login/", json=credentials)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
 @pytest.mark.asyncio
 async def test_logout(client: AsyncClient, default_role):
     # Register and login a user first
@@ -117,4 +180,306 @@ async def test_logout(client: AsyncClient, default_role):
     # Check that cookies are cleared
     for cookie in ["user_access_token", "user_refresh_token"]:
         if cookie in response.cookies:
-            assert response.cookies[cookie] == ""
\ No newline at end of file
+            assert response.cookies[cookie] == ""
+
+@pytest.mark.asyncio
+async def test_logout_revokes_tokens(client: AsyncClient, default_role):
+    await client.post("/auth/register/", json=test_user_data)
+    login_response = await client.post("/auth/login/", json={
+        "email": test_user_data["email"],
+        "password": test_user_data["password"]
+    })
+    cookies = {name: login_response.cookies[name] for name in ("user_access_token", "user_refresh_token")}
+
+    response = await client.get("/auth/me/", cookies=cookies)
+    assert response.status_code == 200
+
+    response = await client.post("/auth/logout", cookies=cookies)
+    assert response.status_code == 200
+
+    # Captured cookies stop working right away, even though the tokens have not expired yet
+    response = await client.get("/auth/me/", cookies=cookies)
+    assert response.status_code == 401
+    response = await client.post("/auth/refresh", cookies=cookies)
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_me_reflects_profile_update(client: AsyncClient, default_role):
+    await client.post("/auth/register/", json=test_user_data)
+    login_response = await client.post("/auth/login/", json={
+        "email": test_user_data["email"],
+        "password": test_user_data["password"]
+    })
+    cookies = {"user_access_token": login_response.cookies["user_access_token"]}
+
+    # First call populates the user cache, second one is served from it
+    response = await client.get("/auth/me/", cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["first_name"] == test_user_data["first_name"]
+
+    response = await client.put("/auth/me/update/", json={"first_name": "Updated"}, cookies=cookies)
+    assert response.status_code == 200
+
+    # The write path must invalidate the cached snapshot
+    response = await client.get("/auth/me/", cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Updated"
+
+@pytest.mark.asyncio
+async def test_me_revalidates_with_etag(client: AsyncClient, default_role, monkeypatch):
+    await client.post("/auth/register/", json=test_user_data)
+    login_response = await client.post("/auth/login/", json={
+        "email": test_user_data["email"],
+        "password": test_user_data["password"]
+    })
+    cookies = {"user_access_token": login_response.cookies["user_access_token"]}
+
+    response = await client.get("/auth/me/", cookies=cookies)
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert "Last-Modified" in response.headers
+
+    monkeypatch.setattr(settings, "DB_QUERY_BUDGET", 0)
+    response = await client.get("/auth/me/", cookies=cookies, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    monkeypatch.setattr(settings, "DB_QUERY_BUDGET", None)
+
+    await client.put("/auth/me/update/", json={"first_name": "Updated"}, cookies=cookies)
+    response = await client.get("/auth/me/", cookies=cookies, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["first_name"] == "Updated"
+
+@pytest.mark.asyncio
+async def test_profile_update_checks_expected_version(client: AsyncClient, default_role, monkeypatch):
+    await client.post("/auth/register/", json=test_user_data)
+    login_response = await client.post("/auth/login/", json={
+        "email": test_user_data["email"],
+        "password": test_user_data["password"]
+    })
+    cookies = {"user_access_token": login_response.cookies["user_access_token"]}
+
+    response = await client.put("/auth/me/update/", params={"expected_version": 1},
+                                json={"first_name": "Updated"}, cookies=cookies)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = await client.put("/auth/me/update/", params={"expected_version": 1},
+                                json={"first_name": "Stale"}, cookies=cookies)
+    assert response.status_code == 409
+
+    # The snapshot from RETURNING is cached on commit, so the next read needs no query
+    monkeypatch.setattr(settings, "DB_QUERY_BUDGET", 0)
+    response = await client.get("/auth/me/", cookies=cookies)
+    assert response.json()["first_name"] == "Updated"
+    assert response.headers["ETag"] == etag
+
+@pytest.mark.asyncio
+async def test_change_password_caches_returned_snapshot(client: AsyncClient, db_session: AsyncSession,
+                                                         default_role, monkeypatch):
+    await client.post("/auth/register/", json=test_user_data)
+    login_response = await client.post("/auth/login/", json={
+        "email": test_user_data["email"],
+        "password": test_user_data["password"]
+    })
+    cookies = {"user_access_token": login_response.cookies["user_access_token"]}
+    etag = (await client.get("/auth/me/", cookies=cookies)).headers["ETag"]
+
+    response = await client.put("/auth/me/change_password/", json={
+        "old_password": test_user_data["password"],
+        "password": "new-password456",
+        "confirm_password": "new-password456"
+    }, cookies=cookies)
+    assert response.status_code == 200
+    # The test session is shared and never committed by the overridden dependency
+    await db_session.commit()
+
+    # The bumped version comes from RETURNING and is cached on commit: no query, new ETag
+    monkeypatch.setattr(settings, "DB_QUERY_BUDGET", 0)
+    response = await client.get("/auth/me/", cookies=cookies)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    monkeypatch.setattr(settings, "DB_QUERY_BUDGET", None)
+
+    response = await client.post("/auth/login/", json={
+        "email": test_user_data["email"],
+        "password": "new-password456"
+    })
+    assert response.status_code == 200
+
+    await db_session.execute(delete(User))
+    await db_session.commit()
+
+@pytest.mark.asyncio
+async def test_me_reports_server_timing_and_fits_query_budget(client: AsyncClient, db_session: AsyncSession,
+                                                              default_role, monkeypatch):
+    await client.post("/auth/register/", json=test_user_data)
+    login_response = await client.post("/auth/login/", json={
+        "email": test_user_data["email"],
+        "password": test_user_data["password"]
+    })
+    cookies = {"user_access_token": login_response.cookies["user_access_token"]}
+    # The role catalog is loaded at startup, so /auth/me/ only needs the user row
+    await role_catalog.load(db_session)
+
+    monkeypatch.setattr(settings, "DB_QUERY_BUDGET", 1)
+    response = await client.get("/auth/me/", cookies=cookies)
+    assert response.status_code == 200
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert response.headers["Server-Timing"].endswith('desc="1 queries"')
+
+    # Cached snapshot: no queries at all
+    monkeypatch.setattr(settings, "DB_QUERY_BUDGET", 0)
+    response = await client.get("/auth/me/", cookies=cookies)
+    assert response.headers["Server-Timing"].endswith('desc="0 queries"')
+
+@pytest.mark.asyncio
+async def test_admin_access_is_a_permission_bit(client: AsyncClient, db_session: AsyncSession, default_role):
+    await client.post("/auth/register/", json=test_user_data)
+    login_response = await client.post("/auth/login/", json={
+        "email": test_user_data["email"],
+        "password": test_user_data["password"]
+    })
+    cookies = {"user_access_token": login_response.cookies["user_access_token"]}
+
+    response = await client.get("/admin/all_role", cookies=cookies)
+    assert response.status_code == 403
+
+    # Creating roles needs MANAGE_ROLES, so a plain user cannot grant itself admin rights
+    response = await client.post("/auth/add_role", json={"id": 42, "name": "Auditor",
+                                                         "permissions": int(Permission.ADMIN)}, cookies=cookies)
+    assert response.status_code == 403
+    response = await client.post("/auth/add_role", json={"id": 42, "name": "Auditor"})
+    assert response.status_code == 400
+
+    await db_session.execute(insert(Role).values(id=42, name="Auditor", permissions=int(Permission.ADMIN_PANEL)))
+    await db_session.execute(update(User).where(User.email == test_user_data["email"]).values(role_id=42))
+    user_cache.clear()
+
+    response = await client.get("/admin/all_role", cookies=cookies)
+    assert response.status_code == 200
+    assert {"id": 42, "name": "Auditor", "permissions": int(Permission.ADMIN_PANEL)} in response.json()
+
+    # The admin panel alone does not allow managing users
+    response = await client.put("/admin/change_role/1", json={"role_id": 42}, cookies=cookies)
+    assert response.status_code == 403
+    response = await client.delete("/admin/delete_user/1", cookies=cookies)
+    assert response.status_code == 403
+
+    response = await client.get("/admin/all_users/", cookies=cookies)
+    assert response.json()["items"][0]["role_name"] == "Auditor"
+
+
+@pytest.mark.asyncio
+async def test_admin_access_sees_changes_from_other_workers(client: AsyncClient, db_session: AsyncSession,
+                                                            default_role):
+    await client.post("/auth/register/", json=test_user_data)
+    await db_session.execute(insert(Role).values(id=2, name="Admin", permissions=int(Permission.ADMIN)))
+    await db_session.execute(update(User).where(User.email == test_user_data["email"]).values(role_id=2))
+    login_response = await client.post("/auth/login/", json={
+        "email": test_user_data["email"],
+        "password": test_user_data["password"]
+    })
+    cookies = {"user_access_token": login_response.cookies["user_access_token"]}
+    response = await client.get("/admin/all_role", cookies=cookies)
+    assert response.status_code == 200
+
+    # Another worker demotes the user: its invalidate_user never reaches this worker's cache
+    await db_session.execute(update(User).where(User.email == test_user_data["email"])
+                             .values(role_id=default_role.id))
+    response = await client.get("/admin/all_role", cookies=cookies)
+    assert response.status_code == 403
+
+    await db_session.execute(delete(User).where(User.email == test_user_data["email"]))
+    response = await client.get("/admin/all_role", cookies=cookies)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_admin_search_users(client: AsyncClient, db_session: AsyncSession, default_role, clean_users):
+    await client.post("/auth/register/", json=test_user_data)
+    await client.post("/auth/register/", json={**test_user_data, "email": "other@example.com",
+                                               "phone_number": "+987654321", "first_name": "Testa"})
+    await db_session.execute(insert(Role).values(id=2, name="Admin", permissions=int(Permission.ADMIN)))
+    await db_session.execute(update(User).where(User.email == test_user_data["email"]).values(role_id=2))
+    await db_session.commit()
+    login_response = await client.post("/auth/login/", json={
+        "email": test_user_data["email"],
+        "password": test_user_data["password"]
+    })
+    cookies = {"user_access_token": login_response.cookies["user_access_token"]}
+
+    response = await client.get("/admin/search_users", params={"q": "TEST", "limit": 1}, cookies=cookies)
+    assert response.status_code == 200
+    page = response.json()
+    assert [user["email"] for user in page["items"]] == [test_user_data["email"]]
+    assert page["items"][0]["role_name"] == "Admin"
+
+    response = await client.get("/admin/search_users", params={"q": "TEST", "cursor": page["next_cursor"]},
+                                cookies=cookies)
+    page = response.json()
+    assert [user["email"] for user in page["items"]] == ["other@example.com"]
+    assert page["next_cursor"] is None
+
+    response = await client.get("/admin/search_users", params={"q": "+9876", "field": "phone_number"},
+                                cookies=cookies)
+    assert [user["first_name"] for user in response.json()["items"]] == ["Testa"]
+
+    response = await client.get("/admin/search_users", params={"q": "test", "field": "password"}, cookies=cookies)
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_admin_reads_answer_conditional_requests(client: AsyncClient, db_session: AsyncSession, default_role,
+                                                       clean_users):
+    await client.post("/auth/register/", json=test_user_data)
+    await db_session.execute(insert(Role).values(id=2, name="Admin", permissions=int(Permission.ADMIN)))
+    await db_session.execute(update(User).where(User.email == test_user_data["email"]).values(role_id=2))
+    await db_session.commit()
+    login_response = await client.post("/auth/login/", json={
+        "email": test_user_data["email"],
+        "password": test_user_data["password"]
+    })
+    cookies = {"user_access_token": login_response.cookies["user_access_token"]}
+    await client.post("/auth/register/", json={**test_user_data, "email": "other@example.com",
+                                               "phone_number": "+987654321"})
+    user_id = (await db_session.execute(select(User.id).where(User.email == "other@example.com"))).scalar_one()
+
+    response = await client.get(f"/admin/get_user/{user_id}", cookies=cookies)
+    user_etag = response.headers["ETag"]
+    response = await client.get(f"/admin/get_user/{user_id}", cookies=cookies,
+                                headers={"If-None-Match": user_etag})
+    assert response.status_code == 304
+    response = await client.get(f"/admin/get_user/{user_id}", cookies=cookies,
+                                headers={"If-Modified-Since": response.headers["Last-Modified"]})
+    assert response.status_code == 304
+
+    response = await client.get("/admin/all_role", cookies=cookies)
+    roles_etag = response.headers["ETag"]
+    response = await client.get("/admin/all_role", cookies=cookies, headers={"If-None-Match": roles_etag})
+    assert response.status_code == 304
+
+    await client.post("/auth/add_role", json={"id": 42, "name": "Auditor"}, cookies=cookies)
+    response = await client.get("/admin/all_role", cookies=cookies, headers={"If-None-Match": roles_etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+    await client.put(f"/admin/change_role/{user_id}", json={"role_id": 42}, cookies=cookies)
+    response = await client.get(f"/admin/get_user/{user_id}", cookies=cookies,
+                                headers={"If-None-Match": user_etag})
+    assert response.status_code == 200
+    assert response.json()["role_name"] == "Auditor"
+    assert response.headers["ETag"] != user_etag
+
+    # Delete + insert keeps the row count and version sum, the highest id still changes the ETag
+    response = await client.get("/admin/all_role", cookies=cookies)
+    roles_etag = response.headers["ETag"]
+    await db_session.execute(delete(Role).where(Role.id == 42))
+    await db_session.execute(update(User).where(User.id == user_id).values(role_id=default_role.id))
+    await db_session.execute(insert(Role).values(id=43, name="Reviewer"))
+    await db_session.commit()
+    response = await client.get("/admin/all_role", cookies=cookies, headers={"If-None-Match": roles_etag})
+    assert response.status_code == 200
+    assert [role["name"] for role in response.json()][-1] == "Reviewer"
@@ -0,0 +1,28 @@
+import time
+
+from app.cache import TTLCache
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"
+
+    cache.set(3, "c")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_expires_entries():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("key", "value", ttl=0.01)
+    time.sleep(0.02)
+
+    assert cache.get("key") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["misses"] == 1
@@ -0,0 +1,257 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.dao import UsersDAO
+from app.auth.models import Role, User
+from app.auth.schemas import EmailModel, SIdFilterModel, SUserAddDB
+from app.dao.base import StaleVersionError
+from app.dao.batching import BatchLoader, batch_loader
+from app.dao.profiling import QueryBudgetExceeded, assert_max_queries
+from app.dao.statements import statement_cache
+
+
+class SUserBulkUpdate(BaseModel):
+    id: int
+    first_name: str
+
+
+@pytest.fixture
+async def seeded_users(db_session: AsyncSession):
+    await db_session.execute(delete(User))
+    await db_session.execute(delete(Role))
+    db_session.add(Role(id=1, name="User"))
+    db_session.add_all([
+        User(phone_number=f"+3800000{i:04d}", first_name=f"First{i}", last_name=f"Last{i}",
+             email=f"user{i}@example.com", password="hash", role_id=1)
+        for i in range(1, 8)
+    ])
+    await db_session.commit()
+    yield
+    await db_session.execute(delete(User))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_find_page_walks_all_rows_by_cursor(db_session: AsyncSession, seeded_users):
+    dao = UsersDAO(db_session)
+
+    seen = []
+    cursor = None
+    while True:
+        users, cursor = await dao.find_page(cursor=cursor, limit=3)
+        seen.extend(user.email for user in users)
+        if cursor is None:
+            break
+
+    assert seen == [f"user{i}@example.com" for i in range(1, 8)]
+
+
+@pytest.mark.asyncio
+async def test_find_page_returns_no_cursor_on_exact_last_page(db_session: AsyncSession, seeded_users):
+    users, cursor = await UsersDAO(db_session).find_page(limit=7)
+
+    assert len(users) == 7
+    assert cursor is None
+
+
+@pytest.mark.asyncio
+async def test_search_matches_prefix_case_insensitively(db_session: AsyncSession, seeded_users):
+    dao = UsersDAO(db_session)
+
+    users, cursor = await dao.search("USER1")
+    assert [user.email for user in users] == ["user1@example.com"]
+    assert cursor is None
+
+    users, _ = await dao.search("last", fields=("last_name",))
+    assert len(users) == 7
+    users, _ = await dao.search("+38000000003")
+    assert [user.first_name for user in users] == ["First3"]
+    # Префікс, а не підрядок; % і _ не є шаблонами
+    assert (await dao.search("example"))[0] == []
+    assert (await dao.search("user_"))[0] == []
+
+
+@pytest.mark.asyncio
+async def test_search_walks_pages_by_cursor(db_session: AsyncSession, seeded_users):
+    dao = UsersDAO(db_session)
+
+    seen, cursor = [], None
+    while True:
+        users, cursor = await dao.search("first", cursor=cursor, limit=3)
+        seen.extend(user.first_name for user in users)
+        if cursor is None:
+            break
+
+    assert seen == [f"First{i}" for i in range(1, 8)]
+
+
+@pytest.mark.asyncio
+async def test_search_rejects_unknown_fields(db_session: AsyncSession, seeded_users):
+    with pytest.raises(ValueError):
+        await UsersDAO(db_session).search("x", fields=("password",))
+
+
+@pytest.mark.asyncio
+async def test_stream_all_yields_rows_in_id_order(db_session: AsyncSession, seeded_users):
+    emails = [user.email async for user in UsersDAO(db_session).stream_all(batch_size=2)]
+
+    assert emails == [f"user{i}@example.com" for i in range(1, 8)]
+
+
+@pytest.mark.asyncio
+async def test_add_many_and_upsert_many_skip_conflicts(db_session: AsyncSession, seeded_users):
+    dao = UsersDAO(db_session)
+    new_users = [
+        SUserAddDB(email=f"bulk{i}@example.com", phone_number=f"+3801111{i:04d}",
+                   first_name="Bulk", last_name="User", password="hashed")
+        for i in range(5)
+    ]
+
+    assert await dao.add_many(new_users, chunk_size=2) == [2, 2, 1]
+
+    duplicates = new_users[:2] + [
+        SUserAddDB(email="fresh@example.com", phone_number="+380222220000",
+                   first_name="Fresh", last_name="User", password="hashed"),
+        # Unique phone number conflict must be skipped as well
+        SUserAddDB(email="other@example.com", phone_number=new_users[4].phone_number,
+                   first_name="Other", last_name="User", password="hashed"),
+    ]
+    assert await dao.upsert_many(duplicates, chunk_size=3) == [1, 0]
+
+
+@pytest.mark.asyncio
+async def test_upsert_many_updates_on_email_conflict(db_session: AsyncSession, seeded_users):
+    dao = UsersDAO(db_session)
+    changed = SUserAddDB(email="user1@example.com", phone_number="+380000000001",
+                         first_name="Renamed", last_name="Last1", password="hashed")
+
+    assert await dao.upsert_many([changed], update_fields=["first_name"]) == [1]
+
+    db_session.expire_all()
+    user = await dao.find_one_or_none(filters=EmailModel(email="user1@example.com"))
+    assert user.first_name == "Renamed"
+
+
+@pytest.mark.asyncio
+async def test_update_many_applies_per_row_values(db_session: AsyncSession, seeded_users):
+    dao = UsersDAO(db_session)
+    users, _ = await dao.find_page(limit=3)
+    user_ids = [user.id for user in users]
+
+    rows = [SUserBulkUpdate(id=user_id, first_name=f"Batch{user_id}") for user_id in user_ids]
+    assert await dao.update_many(rows, chunk_size=2) == [2, 1]
+
+    db_session.expire_all()
+    for user_id in user_ids:
+        refreshed = await dao.find_one_or_none_by_id(data_id=user_id)
+        assert refreshed.first_name == f"Batch{user_id}"
+
+
+@pytest.mark.asyncio
+async def test_writes_bump_row_version(db_session: AsyncSession, seeded_users):
+    dao = UsersDAO(db_session)
+    user = await dao.find_one_or_none(filters=EmailModel(email="user1@example.com"))
+    assert user.version == 1
+    assert user.updated_at is not None
+
+    await dao.update(filters=SIdFilterModel(id=user.id), values=SUserBulkUpdate(id=user.id, first_name="Renamed"))
+    await dao.upsert_many([SUserAddDB(email="user1@example.com", phone_number="+380000000001",
+                                      first_name="Again", last_name="Last1", password="hashed")],
+                          update_fields=["first_name"])
+
+    probe = await dao.find_version(user.id, columns=("first_name",))
+    assert (probe.version, probe.first_name) == (3, "Again")
+    assert (await dao.collection_version()).version == 7 + 2
+
+
+@pytest.mark.asyncio
+async def test_update_returning_checks_expected_version(db_session: AsyncSession, seeded_users):
+    dao = UsersDAO(db_session)
+    user = await dao.find_one_or_none(filters=EmailModel(email="user2@example.com"))
+    values = SUserBulkUpdate(id=user.id, first_name="Returned")
+
+    with assert_max_queries(1):
+        updated = await dao.update_returning(filters=SIdFilterModel(id=user.id), values=values,
+                                             expected_version=1)
+    assert [(row.id, row.first_name, row.version) for row in updated] == [(user.id, "Returned", 2)]
+
+    with pytest.raises(StaleVersionError):
+        await dao.update_returning(filters=SIdFilterModel(id=user.id), values=values, expected_version=1)
+    assert await dao.update_returning(filters=SIdFilterModel(id=10_000), values=values, expected_version=1) == []
+
+
+@pytest.mark.asyncio
+async def test_assert_max_queries_fails_over_budget(db_session: AsyncSession, seeded_users):
+    dao = UsersDAO(db_session)
+
+    with assert_max_queries(1) as stats:
+        await dao.find_one_or_none(filters=EmailModel(email="user1@example.com"))
+    assert stats.count == 1
+
+    with pytest.raises(QueryBudgetExceeded):
+        with assert_max_queries(1):
+            await dao.find_one_or_none(filters=EmailModel(email="user1@example.com"))
+            await dao.find_one_or_none(filters=EmailModel(email="user2@example.com"))
+
+
+@pytest.mark.asyncio
+async def test_statements_are_cached_per_shape(db_session: AsyncSession, seeded_users):
+    dao = UsersDAO(db_session)
+    statement_cache.clear()
+    hits = statement_cache.hits
+
+    first = await dao.find_one_or_none(filters=EmailModel(email="user1@example.com"))
+    second = await dao.find_one_or_none(filters=EmailModel(email="user2@example.com"))
+
+    assert (first.email, second.email) == ("user1@example.com", "user2@example.com")
+    assert statement_cache.hits == hits + 1
+    assert statement_cache.stats()["size"] == 1
+
+    # None in a filter keeps filter_by semantics (IS NULL) and gets its own shape
+    assert await dao.find_all(filters=SIdFilterModel(id=None)) == []
+    assert statement_cache.stats()["size"] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_load_by_id_shares_one_query(db_session: AsyncSession, seeded_users):
+    users, _ = await UsersDAO(db_session).find_page(limit=3)
+    ids = [user.id for user in users]
+    db_session.expunge_all()
+    shared = batch_loader.shared
+
+    with assert_max_queries(1):
+        loaded = await asyncio.gather(*(UsersDAO(db_session).load_by_id(user_id)
+                                        for user_id in [*ids, ids[0], 10_000]))
+
+    assert [user.email for user in loaded[:4]] == [*(user.email for user in users), users[0].email]
+    assert loaded[4] is None
+    assert batch_loader.shared == shared + 1
+    assert batch_loader.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_loader_splits_batches_over_max_size(db_session: AsyncSession, seeded_users):
+    users, _ = await UsersDAO(db_session).find_page(limit=5)
+    loader = BatchLoader(max_batch=2)
+
+    with assert_max_queries(3):
+        loaded = await asyncio.gather(*(loader.load(UsersDAO(db_session), user.id) for user in users))
+
+    assert [user.id for user in loaded] == [user.id for user in users]
+    assert loader.stats() == {"pending": 0, "batches": 3, "keys": 5, "shared": 0}
+
+
+@pytest.mark.asyncio
+async def test_add_if_not_exists_does_not_log_values(db_session: AsyncSession, seeded_users, caplog):
+    values = SUserAddDB(email="new@example.com", phone_number="+380009999999", first_name="New",
+                        last_name="User", password="$2b$04$secret-hash")
+    with caplog.at_level("INFO", logger="FastapiApp"):
+        assert await UsersDAO(db_session).add_if_not_exists(values) is not None
+        assert await UsersDAO(db_session).add_if_not_exists(values) is None
+
+    assert "password" in caplog.text
+    assert "secret-hash" not in caplog.text
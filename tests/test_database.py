@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import text
+
+from app.dao.database import build_engine, get_pool_stats, warm_up_pool
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_track_checkouts(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            stats = get_pool_stats(engine)
+            assert stats["checked_out"] == 1
+
+        stats = get_pool_stats(engine)
+        assert stats["checked_out"] == 0
+        assert stats["idle"] == 1
+        assert stats["checkout_wait_seconds"]["count"] == 1
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_pool_opens_connections_and_runs_queries(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'warm.db'}")
+    executed = []
+
+    async def query(session):
+        executed.append((await session.execute(text("SELECT 1"))).scalar_one())
+
+    try:
+        assert await warm_up_pool(engine, 3, [query, query]) == 3
+        assert executed == [1] * 6
+        stats = get_pool_stats(engine)
+        assert stats["checked_out"] == 0
+        assert stats["idle"] == 3
+    finally:
+        await engine.dispose()
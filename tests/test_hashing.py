@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth.hashing import PasswordHasher, calibrate_bcrypt_rounds, pwd_context
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_in_pool():
+    hasher = PasswordHasher(max_workers=2, max_queue=4)
+    try:
+        hashed = await hasher.hash("password123")
+
+        assert hashed != "password123"
+        assert await hasher.verify("password123", hashed) is True
+        assert await hasher.verify("wrong_password", hashed) is False
+
+        stats = hasher.stats()
+        assert stats["completed"] == 3
+        assert stats["in_flight"] == 0
+        assert stats["latency_max_ms"] > 0
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hasher_rejects_when_queue_is_full():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    try:
+        results = await asyncio.gather(
+            *(hasher.hash("password123") for _ in range(3)),
+            return_exceptions=True,
+        )
+
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        assert len(rejected) == 1
+        assert rejected[0].status_code == 503
+        assert hasher.stats()["rejected"] == 1
+    finally:
+        hasher.shutdown()
+
+
+def test_calibration_respects_bounds():
+    assert calibrate_bcrypt_rounds(target_ms=0.001, min_rounds=4, max_rounds=6) == 4
+    assert calibrate_bcrypt_rounds(target_ms=10_000, min_rounds=4, max_rounds=6) == 6
+
+
+@pytest.mark.asyncio
+async def test_hashes_with_other_cost_need_rehash():
+    hasher = PasswordHasher(max_workers=1, max_queue=1, use_processes=False)
+    old_hash = pwd_context.handler("bcrypt").using(rounds=4).hash("password123")
+    stronger_hash = pwd_context.handler("bcrypt").using(rounds=6).hash("password123")
+    saved = pwd_context.to_dict()
+    try:
+        assert hasher.needs_rehash(old_hash) is False
+
+        await hasher.calibrate(target_ms=250, min_rounds=4, max_rounds=8, rounds=5)
+        assert hasher.needs_rehash(old_hash) is True
+        # Stronger hashes are never downgraded to the calibrated cost
+        assert hasher.needs_rehash(stronger_hash) is False
+
+        new_hash = await hasher.rehash("password123")
+        assert new_hash.startswith("$2b$05$")
+        assert hasher.needs_rehash(new_hash) is False
+        assert await hasher.verify("password123", new_hash) is True
+        assert hasher.stats()["rehashed"] == 1
+    finally:
+        pwd_context.load(saved)
+        hasher.shutdown()
@@ -0,0 +1,45 @@
+import json
+import logging
+import queue
+
+from app.logger import DeferredQueueHandler, JsonFormatter, SamplingFilter
+
+
+def make_record(name: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, "Знайдено %s записів.", (3,), None)
+
+
+def test_sampling_filter_uses_nearest_configured_logger():
+    sampling = SamplingFilter({"sqlalchemy": 0.0, "FastapiApp": 1.0})
+
+    assert sampling.filter(make_record("sqlalchemy.engine")) is False
+    assert sampling.filter(make_record("FastapiApp")) is True
+    assert sampling.filter(make_record("uvicorn.access")) is True
+
+
+def test_sampling_filter_never_drops_warnings():
+    sampling = SamplingFilter({"FastapiApp": 0.0})
+
+    assert sampling.filter(make_record("FastapiApp", logging.ERROR)) is True
+
+
+def test_json_formatter_renders_lazy_arguments():
+    payload = json.loads(JsonFormatter().format(make_record("FastapiApp")))
+
+    assert payload["level"] == "INFO"
+    assert payload["logger"] == "FastapiApp"
+    assert payload["message"] == "Знайдено 3 записів."
+
+
+def test_deferred_queue_handler_snapshots_arguments():
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    filters = {"email": "user@example.com"}
+    record = logging.LogRecord("FastapiApp", logging.INFO, __file__, 1, "Фільтри: %s", (filters,), None)
+
+    DeferredQueueHandler(log_queue).emit(record)
+    # The caller keeps mutating its objects while the record waits in the queue
+    filters["email"] = "changed@example.com"
+
+    queued = log_queue.get_nowait()
+    assert queued.getMessage() == "Фільтри: {'email': 'user@example.com'}"
+    assert queued.args is None
@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+from httpx import AsyncClient
+
+from app.metrics import MetricsRegistry
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_route_templates(client: AsyncClient):
+    await client.post("/auth/logout")
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="POST",route="/auth/logout",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/auth/logout",le="+Inf"}' in body
+    assert "# TYPE http_requests_in_progress gauge" in body
+
+
+def test_registry_merges_worker_files(tmp_path):
+    registry = MetricsRegistry(multiproc_dir=str(tmp_path))
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.inc(("/a",), 2)
+    latency.observe(0.05)
+
+    # Another worker that already exited: its counters stay, its gauges are dropped
+    other = MetricsRegistry(multiproc_dir=str(tmp_path))
+    other.counter("requests_total", "Requests", ("route",)).inc(("/a",), 3)
+    other.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)).observe(0.5)
+    other.gauge("in_progress", "In progress").set(7)
+    (tmp_path / "999999999.json").write_text(json.dumps(other.export()))
+
+    body = registry.render()
+
+    assert 'requests_total{route="/a"} 5' in body
+    assert 'latency_seconds_bucket{le="0.1"} 1' in body
+    assert 'latency_seconds_bucket{le="1.0"} 2' in body
+    assert "latency_seconds_count 2" in body
+    assert "in_progress" not in body
+    assert (tmp_path / f"{os.getpid()}.json").exists()
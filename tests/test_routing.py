@@ -0,0 +1,132 @@
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from httpx import AsyncClient
+from sqlalchemy import select, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.auth.models import User
+from app.dao.routing import READ_PRIMARY_COOKIE, ReplicaRouter, session_wrote
+from app.middleware import ReadYourWritesMiddleware
+
+
+async def make_database(path, name: str) -> async_sessionmaker:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE node (name TEXT)"))
+        await conn.execute(text("INSERT INTO node VALUES (:name)"), {"name": name})
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def read_node(router: ReplicaRouter, primary_until: float | None = None) -> str:
+    session = router.open_read_session(primary_until)
+    try:
+        return (await session.execute(text("SELECT name FROM node"))).scalar_one()
+    finally:
+        await session.close()
+
+
+@pytest.fixture
+async def databases(tmp_path):
+    primary = await make_database(tmp_path / "primary.db", "primary")
+    replica_a = await make_database(tmp_path / "replica_a.db", "replica_a")
+    replica_b = await make_database(tmp_path / "replica_b.db", "replica_b")
+    yield primary, replica_a, replica_b
+    for maker in (primary, replica_a, replica_b):
+        await maker.kw["bind"].dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_are_spread_round_robin(databases):
+    primary, replica_a, replica_b = databases
+    router = ReplicaRouter(primary, [replica_a, replica_b])
+
+    nodes = [await read_node(router) for _ in range(4)]
+
+    assert nodes == ["replica_a", "replica_b", "replica_a", "replica_b"]
+    assert router.stats()["replica_reads"] == 4
+
+
+@pytest.mark.asyncio
+async def test_user_reads_stick_to_primary_after_own_write(databases):
+    primary, replica_a, replica_b = databases
+    router = ReplicaRouter(primary, [replica_a, replica_b], sticky_window=60)
+
+    # The deadline comes from the client's cookie, so any worker honours it
+    assert await read_node(router, primary_until=router.sticky_deadline()) == "primary"
+    assert await read_node(router, primary_until=time.time() - 1) == "replica_a"
+    assert await read_node(router) == "replica_b"
+
+
+@pytest.mark.asyncio
+async def test_only_writing_sessions_are_marked(db_session: AsyncSession):
+    await db_session.execute(select(User).limit(1))
+    assert session_wrote(db_session) is False
+
+    await db_session.execute(update(User).where(User.id == -1).values(first_name="Nobody"))
+    assert session_wrote(db_session) is True
+    assert session_wrote(db_session) is False
+
+
+@pytest.mark.asyncio
+async def test_write_sets_read_primary_cookie():
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    @app.post("/write")
+    async def write(request: Request) -> dict:
+        request.state.read_primary_until = time.time() + 5
+        return {}
+
+    @app.get("/read")
+    async def read() -> dict:
+        return {}
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/write")
+        assert float(response.cookies[READ_PRIMARY_COOKIE]) > time.time()
+        assert "Max-Age=5" in response.headers["set-cookie"]
+        assert "set-cookie" not in (await client.get("/read")).headers
+
+
+@pytest.mark.asyncio
+async def test_read_session_takes_no_connection_until_first_query(databases):
+    primary, replica_a, _ = databases
+    router = ReplicaRouter(primary, [replica_a])
+
+    # A request answered from the user cache never runs SQL, so it must not hold a replica connection
+    session = router.open_read_session()
+    assert replica_a.kw["bind"].pool.checkedout() == 0
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_replica_falls_back(databases, tmp_path):
+    primary, replica_a, _ = databases
+    broken = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'x.db'}"),
+                                class_=AsyncSession)
+    router = ReplicaRouter(primary, [broken, replica_a], retry_after=60)
+
+    assert await router.check_replicas() == 1
+    stats = router.stats()
+    assert stats["healthy_replicas"] == 1
+    assert stats["failovers"] == 1
+
+    # While the replica is marked down, reads skip it
+    assert [await read_node(router) for _ in range(2)] == ["replica_a", "replica_a"]
+    assert router.stats()["failovers"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_connection_in_a_request_marks_replica_down(databases, tmp_path):
+    primary, _, _ = databases
+    broken = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'x.db'}"),
+                                class_=AsyncSession)
+    router = ReplicaRouter(primary, [broken], retry_after=60)
+
+    with pytest.raises(OperationalError):
+        await read_node(router)
+    assert router.stats()["healthy_replicas"] == 0
+    assert await read_node(router) == "primary"
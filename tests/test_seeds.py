@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import insert, select
+
+from app.auth.models import User
+from app.auth.schemas import SUserAddDB
+from app.dao.database import Base, build_engine
+from app.seeds.bulk import generate_users, seed_users, seeded_until
+
+
+@pytest.fixture
+async def seed_engine(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'seed.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+async def dump_users(engine) -> list[tuple]:
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            select(User.email, User.phone_number, User.first_name, User.last_name, User.role_id).order_by(User.id)
+        )
+        return result.all()
+
+
+def test_generated_users_are_valid_and_independent_of_batching():
+    roles = {1: 0.9, 2: 0.1}
+    users = list(generate_users(seed=7, start=0, stop=2500, password_hash="hashed", roles=roles,
+                                domain="seed.example.com"))
+    tail = list(generate_users(seed=7, start=1234, stop=2500, password_hash="hashed", roles=roles,
+                               domain="seed.example.com"))
+
+    assert users[1234:] == tail
+    assert len({user[0] for user in users}) == len({user[1] for user in users}) == 2500
+    for email, phone, first_name, last_name, password, role_id in users[:50]:
+        SUserAddDB(email=email, phone_number=phone, first_name=first_name, last_name=last_name, password=password)
+    assert {user[5] for user in users} == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_seeding_is_resumable_and_deterministic(seed_engine, tmp_path):
+    assert await seed_users(seed_engine, 120, seed=3, batch_size=50) == 120
+    # A second run only adds the missing users
+    assert await seed_users(seed_engine, 250, seed=3, batch_size=64) == 130
+    assert await seed_users(seed_engine, 250, seed=3) == 0
+
+    one_shot = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'one_shot.db'}")
+    try:
+        async with one_shot.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await seed_users(one_shot, 250, seed=3, batch_size=1000)
+        assert await dump_users(one_shot) == await dump_users(seed_engine)
+    finally:
+        await one_shot.dispose()
+
+
+@pytest.mark.asyncio
+async def test_resume_starts_after_highest_seeded_index(seed_engine):
+    async with seed_engine.begin() as conn:
+        await conn.execute(insert(User), [
+            # Not produced by the generator, but inside the seeded domain
+            {"email": "admin@seed.example.com", "phone_number": "+380999999999", "first_name": "Admin",
+             "last_name": "Admin", "password": "hashed", "role_id": 1},
+            # Takes the phone number of seeded user 5, so that user is skipped by ON CONFLICT
+            {"email": "real@example.com", "phone_number": "+380000000005", "first_name": "Real",
+             "last_name": "User", "password": "hashed", "role_id": 1},
+        ])
+    assert await seeded_until(seed_engine, "seed.example.com") == 0
+
+    assert await seed_users(seed_engine, 120, seed=3, batch_size=50) == 119
+    assert await seeded_until(seed_engine, "seed.example.com") == 120
+    assert await seed_users(seed_engine, 250, seed=3, batch_size=64) == 130
+    assert await seed_users(seed_engine, 250, seed=3) == 0
+
+    emails = [row.email for row in await dump_users(seed_engine)]
+    expected = [user[0] for user in generate_users(seed=3, start=0, stop=250, password_hash="hashed",
+                                                   roles={1: 1.0}, domain="seed.example.com")]
+    assert emails[2:] == expected[:5] + expected[6:]
+    # Seeded users share a known password, so admins only appear when --roles asks for them
+    assert {row.role_id for row in await dump_users(seed_engine)} == {1}
@@ -0,0 +1,53 @@
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import Numeric, Uuid
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from app.auth.models import Role, User
+from app.auth.schemas import SUserInfo
+from app.serialization import get_serializer, json_dumps, model_to_dict
+
+
+class _Base(DeclarativeBase):
+    pass
+
+
+class Invoice(_Base):
+    __tablename__ = "invoices"
+
+    number: Mapped[str]
+    id: Mapped[int] = mapped_column(primary_key=True)
+    issued_at: Mapped[datetime]
+    due_on: Mapped[date]
+    reminder_at: Mapped[time]
+    total: Mapped[Decimal] = mapped_column(Numeric(10, 2))
+    token: Mapped[uuid.UUID] = mapped_column(Uuid)
+    note: Mapped[str | None]
+
+
+def test_model_to_dict_converts_by_column_type():
+    token = uuid.uuid4()
+    invoice = Invoice(number="A-1", id=1, issued_at=datetime(2025, 3, 19, 18, 55), due_on=date(2025, 4, 1),
+                      reminder_at=time(9, 30), total=Decimal("9.50"), token=token, note=None)
+
+    row = model_to_dict(invoice)
+    # Same keys, order and value types as the per-value isinstance checks it replaced
+    assert list(row.items()) == [
+        ("number", "A-1"), ("id", 1), ("issued_at", "2025-03-19T18:55:00"), ("due_on", date(2025, 4, 1)),
+        ("reminder_at", time(9, 30)), ("total", 9.5), ("token", str(token)), ("note", None),
+    ]
+    assert "note" not in model_to_dict(invoice, exclude_none=True)
+    assert get_serializer(Invoice) is get_serializer(Invoice)
+
+
+def test_dump_row_matches_pydantic_output():
+    user = User(id=7, email="user@example.com", phone_number="+380501234567", first_name="Test",
+                last_name="User", password="hashed", role_id=2)
+    user.role = Role(id=2, name="Admin", permissions=7)
+
+    row = SUserInfo.dump_row(user)
+    assert row == SUserInfo.model_validate(user).model_dump(mode="json")
+    assert json_dumps([row]) == JSONResponse([row]).body
@@ -0,0 +1,50 @@
+import os
+import shutil
+
+from app.config import settings
+from app.server import bcrypt_rounds, metrics_dir, plan_workers
+
+
+def test_workers_default_to_cpu_count_without_budget():
+    plan = plan_workers(cpus=4, workers=None, budget=None, pool_size=10, max_overflow=5)
+    assert (plan.workers, plan.pool_size, plan.max_overflow) == (4, 10, 5)
+
+
+def test_budget_is_split_across_workers():
+    plan = plan_workers(cpus=8, workers=None, budget=80, pool_size=10, max_overflow=5)
+    assert plan.workers == 8
+    assert plan.pool_size + plan.max_overflow == 10
+    assert plan.workers * (plan.pool_size + plan.max_overflow) <= 80
+
+
+def test_small_budget_limits_workers():
+    plan = plan_workers(cpus=16, workers=None, budget=6, pool_size=10, max_overflow=5)
+    assert plan.workers == 6
+    assert (plan.pool_size, plan.max_overflow) == (1, 0)
+
+
+def test_bcrypt_rounds_are_fixed_or_calibrated_once(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 6)
+    assert bcrypt_rounds() == 6
+
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", None)
+    monkeypatch.setattr(settings, "BCRYPT_MIN_ROUNDS", 4)
+    monkeypatch.setattr(settings, "BCRYPT_MAX_ROUNDS", 4)
+    assert bcrypt_rounds() == 4
+
+
+def test_metrics_dir_defaults_to_temp_dir_for_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", None)
+    assert metrics_dir(1) is None
+
+    directory = metrics_dir(4)
+    assert directory is not None
+    assert os.path.isdir(directory)
+    shutil.rmtree(directory)
+
+
+def test_metrics_dir_is_cleared_at_start(monkeypatch, tmp_path):
+    (tmp_path / "12345.json").write_text("{}")
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    assert metrics_dir(1) == str(tmp_path)
+    assert list(tmp_path.glob("*.json")) == []
@@ -0,0 +1,49 @@
+import time
+
+from app.auth.throttling import LoginThrottle, TokenBucketLimiter
+
+
+def test_bucket_allows_burst_then_reports_retry_after():
+    limiter = TokenBucketLimiter(rate=0.5, capacity=3)
+
+    assert [limiter.acquire("1.2.3.4") for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = limiter.acquire("1.2.3.4")
+    assert 0 < wait <= 2
+    assert limiter.stats()["rejected"] == 1
+    # Other keys have their own bucket
+    assert limiter.acquire("5.6.7.8") == 0.0
+
+
+def test_bucket_refills_over_time(monkeypatch):
+    limiter = TokenBucketLimiter(rate=1.0, capacity=1)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    assert limiter.acquire("key") == 0.0
+    assert limiter.acquire("key") > 0
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 1.0)
+    assert limiter.acquire("key") == 0.0
+
+
+def test_bucket_memory_is_bounded():
+    limiter = TokenBucketLimiter(rate=1.0, capacity=1, shards=4, max_keys=40)
+    for i in range(1000):
+        limiter.acquire(f"10.0.{i // 256}.{i % 256}")
+
+    stats = limiter.stats()
+    assert stats["keys"] <= 40
+    assert stats["evictions"] == 1000 - stats["keys"]
+
+
+def test_login_throttle_limits_email_across_ips():
+    throttle = LoginThrottle(
+        per_ip=TokenBucketLimiter(rate=1.0, capacity=100),
+        per_email=TokenBucketLimiter(rate=0.1, capacity=2),
+    )
+    assert throttle.check("1.1.1.1", "admin@mail.com") == 0
+    assert throttle.check("2.2.2.2", "Admin@mail.com") == 0
+    assert throttle.check("3.3.3.3", "admin@mail.com") == 10
+    assert throttle.stats()["email_rejected"] == 1
+
+    throttle.enabled = False
+    assert throttle.check("3.3.3.3", "admin@mail.com") == 0
@@ -0,0 +1,102 @@
+import time
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from jose import ExpiredSignatureError, JWTError, jwt
+
+from app.auth.models import RevokedToken
+from app.auth.revocation import BloomFilter, RevocationStore
+from app.auth.utils import create_tokens, decode_token, token_cache
+from app.config import settings
+
+
+@pytest.fixture(autouse=True)
+def clean_token_cache():
+    token_cache.clear()
+
+
+def test_decode_token_serves_repeated_tokens_from_cache():
+    token = create_tokens({"sub": "42"})["access_token"]
+    hits = token_cache.hits
+
+    first = decode_token(token)
+    second = decode_token(token)
+
+    assert first["sub"] == second["sub"] == "42"
+    assert token_cache.hits == hits + 1
+
+
+def test_cached_token_expires_at_its_own_exp():
+    exp = int(time.time()) + 1
+    token = jwt.encode({"sub": "42", "exp": exp}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    decode_token(token)
+
+    # Cache entry must not outlive the token's exp
+    time.sleep(exp - time.time() + 1.1)
+    with pytest.raises(ExpiredSignatureError):
+        decode_token(token)
+
+
+def test_invalid_token_is_not_cached():
+    with pytest.raises(JWTError):
+        decode_token("not-a-jwt")
+
+    assert len(token_cache) == 0
+
+
+def test_tokens_carry_unique_jti():
+    tokens = create_tokens({"sub": "42"})
+    access, refresh = decode_token(tokens["access_token"]), decode_token(tokens["refresh_token"])
+    assert access["jti"] != refresh["jti"]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(size_bits=1 << 12, hashes=5)
+    items = [f"jti-{i}" for i in range(200)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+
+
+def test_revocation_store_forgets_expired_jti():
+    store = RevocationStore(bloom_size_bits=1 << 12, bloom_hashes=5)
+    store.add("live", time.time() + 60)
+    store.add("expired", time.time() - 1)
+
+    assert store.is_revoked("live")
+    assert not store.is_revoked("expired")
+    assert not store.is_revoked(None)
+
+    store._revoked["live"] = time.time() - 1
+    assert store.purge() == 1
+    assert not store.is_revoked("live")
+
+
+@pytest.mark.asyncio
+async def test_revocation_sync_picks_up_rows_committed_out_of_order(db_session: AsyncSession):
+    store = RevocationStore(bloom_size_bits=1 << 12, bloom_hashes=5, lookback=100)
+    expires_at = int(time.time()) + 60
+    await db_session.execute(delete(RevokedToken))
+
+    # Rows 10 and 11 come from concurrent logouts; 11 commits first
+    db_session.add(RevokedToken(id=11, jti="second", expires_at=expires_at))
+    await db_session.commit()
+    assert await store.sync(db_session) == 1
+    assert store.stats()["gaps"] == 10
+
+    db_session.add(RevokedToken(id=10, jti="first", expires_at=expires_at))
+    await db_session.commit()
+    assert await store.sync(db_session) == 1
+    assert store.is_revoked("first")
+    assert store.stats()["gaps"] == 9
+
+    db_session.add(RevokedToken(id=200, jti="later", expires_at=expires_at))
+    await db_session.commit()
+    await store.sync(db_session)
+    # Gaps that fall behind the lookback window are given up
+    stats = store.stats()
+    assert (stats["revoked"], stats["last_id"], stats["gaps"]) == (3, 200, 99)
+
+    await db_session.execute(delete(RevokedToken))
+    await db_session.commit()